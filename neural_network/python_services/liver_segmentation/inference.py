@@ -15,7 +15,10 @@ Complete DICOM to segmentation pipeline with:
 import os
 import json
 import time
+import hashlib
+import queue
 import logging
+import threading
 import traceback
 import warnings
 from datetime import datetime
@@ -32,6 +35,11 @@ from scipy import ndimage
 from scipy.spatial import ConvexHull
 from skimage import measure, morphology
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -43,6 +51,19 @@ logger = logging.getLogger(__name__)
 warnings.filterwarnings('ignore')
 
 
+def _write_json(path: Union[str, Path], data: Any):
+    """Write JSON with orjson (C encoder, native NumPy support) or stdlib json as fallback"""
+    if orjson is not None:
+        Path(path).write_bytes(orjson.dumps(
+            data,
+            default=str,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        ))
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2, default=str)
+
+
 @dataclass
 class InferenceConfig:
     """Configuration for inference pipeline"""
@@ -72,7 +93,7 @@ class InferenceConfig:
     window_size: Tuple[int, int, int] = (128, 128, 128)
     window_overlap: float = 0.5
     tta: bool = False  # Test Time Augmentation
-    tta_rotations: List[int] = [0, 90, 180, 270]
+    tta_rotations: List[int] = None
     
     # Postprocessing
     min_liver_volume_ml: float = 200.0
@@ -85,6 +106,7 @@ class InferenceConfig:
     smoothing_sigma: float = 1.0
     morphological_closing: bool = True
     closing_kernel_size: int = 3
+    gpu_postprocessing: bool = False  # run postprocessing on GPU with CuPy
     
     # Output settings
     output_formats: List[str] = None
@@ -109,6 +131,17 @@ class InferenceConfig:
     cache_size: int = 10
     prefetch_factor: int = 2
     use_deterministic: bool = False
+    compile_model: bool = False  # torch.compile the model once at load time
+    compile_mode: str = "reduce-overhead"  # "default", "reduce-overhead", "max-autotune"
+    cuda_graphs: bool = False  # capture CUDA graphs per input shape (eager model only)
+    warmup: bool = False  # run one forward pass at load time (CUDA with compile/graphs/TensorRT)
+    shape_bucket_multiple: int = 32  # pad inputs of specialized engines to this multiple
+    
+    # TensorRT
+    use_tensorrt: bool = False
+    trt_precision: str = "fp16"  # "fp32", "fp16", "int8" (int8 needs calibration data)
+    trt_cache_dir: str = "models/trt_cache"
+    trt_calibration_dir: str = None  # normalized .npy volumes for INT8 calibration
     
     def __post_init__(self):
         if self.device is None:
@@ -124,6 +157,9 @@ class InferenceConfig:
         
         if self.screenshot_views is None:
             self.screenshot_views = ["axial", "coronal", "sagittal"]
+        
+        if self.tta_rotations is None:
+            self.tta_rotations = [0, 90, 180, 270]
 
 
 class AdvancedDicomLoader:
@@ -175,10 +211,9 @@ class AdvancedDicomLoader:
                 return self._load_single_dicom(path)
             
             # Find all DICOM files
-            dicom_files = []
+            dicom_files = set()
             for ext in [".dcm", ".DCM", ".dicom", ".DICOM"]:
-                dicom_files.extend(path.glob(f"*{ext}"))
-                dicom_files.extend(path.glob(f"**/*{ext}"))
+                dicom_files.update(path.glob(f"**/*{ext}"))
             
             if not dicom_files:
                 # Try all files
@@ -191,44 +226,76 @@ class AdvancedDicomLoader:
             
             logger.info(f"Found {len(dicom_files)} DICOM files")
             
-            # Load metadata from first file
-            first_ds = pydicom.dcmread(dicom_files[0], stop_before_pixels=True)
-            metadata = self._extract_metadata(first_ds)
+            num_workers = max(self.config.num_workers, 1)
             
-            # Load all slices
-            slices = []
-            spacing_z = []
+            # Pass 1: read headers only (no pixel data) in parallel
+            def read_header(file_path: Path):
+                try:
+                    return file_path, pydicom.dcmread(file_path, stop_before_pixels=True, force=True)
+                except (InvalidDicomError, OSError) as e:
+                    logger.warning(f"Skipping file {file_path.name}: {e}")
+                    return file_path, None
+            
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                headers = [
+                    (f, ds) for f, ds in executor.map(read_header, dicom_files)
+                    if ds is not None and hasattr(ds, 'Rows')
+                ]
+            
+            if not headers:
+                raise ValueError("No valid DICOM slices loaded")
+            
+            # Sort slices along the patient axis before touching pixel data
+            if all(hasattr(ds, 'ImagePositionPatient') for _, ds in headers):
+                headers.sort(key=lambda item: float(item[1].ImagePositionPatient[2]))
+            elif all(hasattr(ds, 'InstanceNumber') for _, ds in headers):
+                headers.sort(key=lambda item: int(item[1].InstanceNumber))
             
-            for i, file_path in enumerate(dicom_files):
+            # Load metadata from first slice
+            metadata = self._extract_metadata(headers[0][1])
+            
+            # Pass 2: decode pixel data in parallel into a preallocated volume
+            # (pydicom decompressors release the GIL)
+            volume = np.empty(
+                (len(headers), int(headers[0][1].Rows), int(headers[0][1].Columns)),
+                dtype=np.float32
+            )
+            
+            def decode_slice(index: int) -> bool:
+                file_path, header = headers[index]
                 try:
-                    ds = pydicom.dcmread(file_path, force=True)
-                    
-                    # Get pixel array
-                    pixel_array = ds.pixel_array.astype(np.float32)
-                    
-                    # Convert to HU
-                    if hasattr(ds, 'RescaleSlope') and hasattr(ds, 'RescaleIntercept'):
-                        hu_array = pixel_array * float(ds.RescaleSlope) + float(ds.RescaleIntercept)
-                    else:
-                        hu_array = pixel_array
-                    
-                    slices.append(hu_array)
-                    
-                    # Collect spacing information
-                    if hasattr(ds, 'SliceThickness'):
-                        spacing_z.append(float(ds.SliceThickness))
-                    elif hasattr(ds, 'SpacingBetweenSlices'):
-                        spacing_z.append(float(ds.SpacingBetweenSlices))
-                    
+                    pixel_array = pydicom.dcmread(file_path, force=True).pixel_array
                 except (InvalidDicomError, AttributeError) as e:
                     logger.warning(f"Skipping file {file_path.name}: {e}")
-                    continue
+                    return False
+                
+                out = volume[index]
+                np.copyto(out, pixel_array, casting='unsafe')
+                
+                # Convert to HU
+                if hasattr(header, 'RescaleSlope') and hasattr(header, 'RescaleIntercept'):
+                    out *= float(header.RescaleSlope)
+                    out += float(header.RescaleIntercept)
+                
+                return True
+            
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                valid = np.fromiter(executor.map(decode_slice, range(len(headers))), dtype=bool)
             
-            if not slices:
+            if not valid.any():
                 raise ValueError("No valid DICOM slices loaded")
             
-            # Stack slices
-            volume = np.stack(slices, axis=0)
+            if not valid.all():
+                volume = volume[valid]
+                headers = [item for item, ok in zip(headers, valid) if ok]
+            
+            # Collect spacing information
+            spacing_z = []
+            for _, ds in headers:
+                if hasattr(ds, 'SliceThickness'):
+                    spacing_z.append(float(ds.SliceThickness))
+                elif hasattr(ds, 'SpacingBetweenSlices'):
+                    spacing_z.append(float(ds.SpacingBetweenSlices))
             
             # Update metadata
             metadata['slices'] = volume.shape[0]
@@ -433,7 +500,7 @@ class VolumePreprocessor:
         if window_center == 40.0 and window_width == 400.0:
             # Try to detect liver HU range
             liver_mask = (volume > 30) & (volume < 100)
-            if np.sum(liver_mask) > 1000:
+            if np.count_nonzero(liver_mask) > 1000:
                 liver_hu = volume[liver_mask]
                 window_center = np.median(liver_hu)
                 window_width = np.percentile(liver_hu, 75) - np.percentile(liver_hu, 25)
@@ -511,9 +578,19 @@ class ModelManager:
         self.config = config
         self.model = None
         self.device = None
+        self._importance_cache = None
+        
+        # TensorRT engines / CUDA graphs specialized per input-shape bucket
+        self._engines: Dict[Tuple[int, ...], Any] = {}
         
         self._setup_device()
         self._load_model()
+        self._compile_model()
+        
+        # Only specialized CUDA paths have anything to compile or autotune
+        specialized = self.config.compile_model or self.config.cuda_graphs or self.config.use_tensorrt
+        if self.config.warmup and self.device.type == 'cuda' and specialized:
+            self._warmup()
     
     def _setup_device(self):
         """Setup compute device"""
@@ -553,6 +630,9 @@ class ModelManager:
             
             self.model = AdvancedUNet3D(model_config).to(self.device)
             
+            # Raw logits: _forward applies the sigmoid once, after cropping
+            self.model.output_logits = True
+            
             # Load weights if provided
             if self.config.model_path and Path(self.config.model_path).exists():
                 checkpoint = torch.load(self.config.model_path, map_location=self.device)
@@ -580,74 +660,297 @@ class ModelManager:
             logger.error(f"Failed to load model: {e}")
             raise
     
-    def predict(self, volume_tensor: torch.Tensor) -> np.ndarray:
+    def _compile_model(self):
+        """Compile the model graph once (kernel fusion, fewer launches)"""
+        if not self.config.compile_model or self.config.use_tensorrt:
+            return
+        
+        if not hasattr(torch, 'compile'):
+            logger.warning("torch.compile not available, using eager model")
+            return
+        
+        self.model = torch.compile(self.model, mode=self.config.compile_mode)
+        logger.info(f"Model compiled with mode '{self.config.compile_mode}'")
+    
+    def _warmup(self):
+        """Run one forward pass so compilation and cuDNN autotuning happen at load time"""
+        if self.config.sliding_window:
+            shape = (max(self.config.batch_size, 1), 1) + tuple(self.config.window_size)
+        else:
+            shape = (1, 1) + tuple(self.config.window_size)
+        
+        warmup_start = time.perf_counter_ns()
+        
+        try:
+            with torch.no_grad():
+                self._forward(torch.zeros(shape, device=self.device))
+        except Exception as e:
+            if not self.config.compile_model:
+                raise
+            
+            # Compilation failures surface on the first call; fall back to eager
+            logger.warning(f"Compiled model failed during warmup ({e}), using eager model")
+            self.model = getattr(self.model, '_orig_mod', self.model)
+            self.config.compile_model = False
+            
+            with torch.no_grad():
+                self._forward(torch.zeros(shape, device=self.device))
+        
+        if self.device.type == 'cuda':
+            torch.cuda.synchronize(self.device)
+        
+        logger.info(f"Warmup for input shape {shape} took {(time.perf_counter_ns() - warmup_start) / 1e9:.2f}s")
+    
+    def predict(self, volume_tensor: torch.Tensor,
+                keep_on_device: bool = False) -> Union[np.ndarray, torch.Tensor]:
         """Run inference on volume"""
         with torch.no_grad():
             # Move to device
             volume_tensor = volume_tensor.to(self.device)
             
-            # Apply mixed precision if enabled
-            if self.config.mixed_precision and self.device.type == 'cuda':
-                with torch.cuda.amp.autocast():
-                    output = self.model(volume_tensor)
-            else:
-                output = self.model(volume_tensor)
+            mask = self._forward(volume_tensor).squeeze()
             
-            # Convert to numpy
-            if isinstance(output, tuple):  # Deep supervision
-                output = output[0]
-            
-            mask = torch.sigmoid(output).squeeze().cpu().numpy()
+            if keep_on_device:
+                return mask
             
-            return mask
+            # Convert to numpy
+            return mask.cpu().numpy()
     
-    def sliding_window_inference(self, volume_tensor: torch.Tensor) -> np.ndarray:
-        """Sliding window inference for large volumes"""
-        if not self.config.sliding_window:
-            return self.predict(volume_tensor)
+    def _forward(self, volume_tensor: torch.Tensor) -> torch.Tensor:
+        """Model forward pass returning probabilities on the compute device"""
+        # Shape-specialized paths see only a few padded bucket shapes
+        specialized = self.device.type == 'cuda' and (
+            self.config.use_tensorrt or self.config.cuda_graphs or self.config.compile_model
+        )
+        if specialized:
+            volume_tensor, crop = self._pad_to_bucket(volume_tensor)
         
-        volume_shape = volume_tensor.shape[2:]  # (D, H, W)
-        window_size = self.config.window_size
-        overlap = self.config.window_overlap
+        # TensorRT engine (falls back to PyTorch if unavailable)
+        if self.config.use_tensorrt and self.device.type == 'cuda':
+            output = self._predict_trt(volume_tensor)
         
-        # Calculate stride
-        stride = [int(w * (1 - overlap)) for w in window_size]
+        # Replay a captured CUDA graph (reduce-overhead compilation already uses them)
+        elif (self.config.cuda_graphs and not self.config.compile_model
+              and self.device.type == 'cuda'):
+            output = self._predict_graph(volume_tensor)
+        
+        else:
+            output = self._model_forward(volume_tensor)
+        
+        if specialized:
+            output = output[crop]
+        
+        return torch.sigmoid(output.float())
+    
+    def _pad_to_bucket(self, volume_tensor: torch.Tensor) -> Tuple[torch.Tensor, Tuple]:
+        """Edge-pad spatial dims up to the shape bucket; returns the crop back to the input"""
+        multiple = self.config.shape_bucket_multiple
+        spatial = volume_tensor.shape[2:]
+        pad = [-size % multiple for size in spatial]
+        crop = (Ellipsis,) + tuple(slice(0, size) for size in spatial)
         
-        # Initialize output array
-        output = np.zeros(volume_shape, dtype=np.float32)
-        counts = np.zeros(volume_shape, dtype=np.float32)
+        if any(pad):
+            # Zero is a real intensity after HU normalization; replicate the border instead
+            volume_tensor = F.pad(volume_tensor, (0, pad[2], 0, pad[1], 0, pad[0]), mode='replicate')
         
-        # Generate window positions
-        positions = []
-        for d in range(0, volume_shape[0] - window_size[0] + 1, stride[0]):
-            for h in range(0, volume_shape[1] - window_size[1] + 1, stride[1]):
-                for w in range(0, volume_shape[2] - window_size[2] + 1, stride[2]):
-                    positions.append((d, h, w))
+        return volume_tensor, crop
+    
+    def _model_forward(self, volume_tensor: torch.Tensor) -> torch.Tensor:
+        """PyTorch forward pass with optional mixed precision"""
+        # Apply mixed precision if enabled
+        if self.config.mixed_precision and self.device.type == 'cuda':
+            with torch.cuda.amp.autocast():
+                output = self.model(volume_tensor)
+        else:
+            output = self.model(volume_tensor)
+        
+        if isinstance(output, (tuple, list)):  # Deep supervision
+            output = output[0]
+        
+        return output
+    
+    def _predict_graph(self, volume_tensor: torch.Tensor) -> torch.Tensor:
+        """Run the model through a CUDA graph captured for the input shape"""
+        input_shape = tuple(volume_tensor.shape)
         
-        # Process windows
-        for d, h, w in positions:
-            # Extract window
-            window = volume_tensor[:, :, 
-                                  d:d+window_size[0],
-                                  h:h+window_size[1],
-                                  w:w+window_size[2]]
+        if input_shape not in self._engines:
+            static_input = torch.zeros(input_shape, device=self.device)
             
-            # Predict
-            window_pred = self.predict(window)
+            # Warm up on a side stream before capture, as required by CUDA graphs
+            side_stream = torch.cuda.Stream(self.device)
+            side_stream.wait_stream(torch.cuda.current_stream(self.device))
+            with torch.cuda.stream(side_stream):
+                for _ in range(3):
+                    self._model_forward(static_input)
+            torch.cuda.current_stream(self.device).wait_stream(side_stream)
             
-            # Add to output with blending
-            output[d:d+window_size[0], 
-                  h:h+window_size[1], 
-                  w:w+window_size[2]] += window_pred
+            graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(graph):
+                static_output = self._model_forward(static_input)
             
-            counts[d:d+window_size[0], 
-                  h:h+window_size[1], 
-                  w:w+window_size[2]] += 1
+            self._engines[input_shape] = (graph, static_input, static_output)
+            logger.info(f"Captured CUDA graph for input shape {input_shape}")
         
-        # Average overlapping regions
-        output = output / (counts + 1e-7)
+        graph, static_input, static_output = self._engines[input_shape]
+        static_input.copy_(volume_tensor)
+        graph.replay()
         
-        return output
+        return static_output
+    
+    def _predict_trt(self, volume_tensor: torch.Tensor) -> torch.Tensor:
+        """Run inference through a TensorRT engine built for the input shape"""
+        input_shape = tuple(volume_tensor.shape)
+        
+        if input_shape not in self._engines:
+            try:
+                self._engines[input_shape] = self._load_trt_engine(input_shape)
+            except ImportError:
+                logger.warning("TensorRT not available, falling back to PyTorch")
+                self.config.use_tensorrt = False
+                return self._model_forward(volume_tensor)
+        
+        return self._engines[input_shape](volume_tensor)
+    
+    def _load_trt_engine(self, input_shape: Tuple[int, ...]):
+        """Load a cached TensorRT engine or build it from an ONNX export"""
+        from .model import TensorRTEngine, export_onnx
+        
+        cache_dir = self.config.trt_cache_dir
+        precision = self.config.trt_precision
+        
+        # The model exports raw logits; keying on it keeps sigmoid-output engines out
+        engine_path = TensorRTEngine.cache_path(cache_dir, input_shape, precision, "logits")
+        
+        if os.path.exists(engine_path):
+            logger.info(f"Loading cached TensorRT engine {engine_path}")
+            return TensorRTEngine(engine_path, str(self.device))
+        
+        calibration_volumes = None
+        calibration_cache = os.path.join(cache_dir, "int8_calibration.cache")
+        if precision == "int8" and self.config.trt_calibration_dir:
+            calibration_volumes = [
+                np.load(path).astype(np.float32)
+                for path in sorted(Path(self.config.trt_calibration_dir).glob("*.npy"))
+            ]
+        
+        if precision == "int8" and not calibration_volumes and not os.path.exists(calibration_cache):
+            logger.warning("No INT8 calibration volumes or cache found, building an FP16 engine")
+            precision = "fp16"
+            engine_path = TensorRTEngine.cache_path(cache_dir, input_shape, precision, "logits")
+            
+            if os.path.exists(engine_path):
+                logger.info(f"Loading cached TensorRT engine {engine_path}")
+                return TensorRTEngine(engine_path, str(self.device))
+        
+        os.makedirs(cache_dir, exist_ok=True)
+        model = self.model.module if isinstance(self.model, torch.nn.DataParallel) else self.model
+        onnx_path = export_onnx(model, os.path.join(cache_dir, "unet3d_logits.onnx"), input_shape)
+        
+        return TensorRTEngine.build(
+            onnx_path, engine_path, input_shape,
+            precision=precision,
+            calibration_volumes=calibration_volumes,
+            calibration_cache=calibration_cache,
+            device=str(self.device)
+        )
+    
+    def sliding_window_inference(self, volume_tensor: torch.Tensor,
+                                 keep_on_device: bool = False) -> Union[np.ndarray, torch.Tensor]:
+        """Sliding window inference with Gaussian-weighted overlap-add"""
+        if not self.config.sliding_window:
+            return self.predict(volume_tensor, keep_on_device)
+        
+        volume_shape = tuple(volume_tensor.shape[2:])  # (D, H, W)
+        window_size = tuple(self.config.window_size)
+        overlap = self.config.window_overlap
+        batch_size = max(self.config.batch_size, 1)
+        
+        with torch.no_grad():
+            volume_tensor = volume_tensor.to(self.device)
+            
+            # Pad so that every axis fits at least one window
+            pad = [max(w - s, 0) for w, s in zip(window_size, volume_shape)]
+            if any(pad):
+                volume_tensor = F.pad(
+                    volume_tensor,
+                    (0, pad[2], 0, pad[1], 0, pad[0]),
+                    value=float(volume_tensor.min())
+                )
+            padded_shape = tuple(volume_tensor.shape[2:])
+            
+            # Window origins per axis; the last window is aligned to the edge
+            starts = []
+            for size, window in zip(padded_shape, window_size):
+                stride = max(int(window * (1 - overlap)), 1)
+                axis_starts = list(range(0, size - window + 1, stride))
+                if axis_starts[-1] != size - window:
+                    axis_starts.append(size - window)
+                starts.append(axis_starts)
+            
+            positions = [(d, h, w) for d in starts[0] for h in starts[1] for w in starts[2]]
+            
+            # Accumulate weighted predictions on the compute device
+            output = torch.zeros(padded_shape, dtype=torch.float32, device=self.device)
+            weights = torch.zeros(padded_shape, dtype=torch.float32, device=self.device)
+            importance = self._importance_map(window_size)
+            
+            # Shape-specialized engines need a constant batch shape; eager runs short batches as-is
+            fixed_batch = self.device.type == 'cuda' and (
+                self.config.use_tensorrt or self.config.cuda_graphs or self.config.compile_model
+            )
+            
+            for i in range(0, len(positions), batch_size):
+                batch_positions = positions[i:i + batch_size]
+                
+                batch = torch.cat([
+                    volume_tensor[:, :,
+                                  d:d + window_size[0],
+                                  h:h + window_size[1],
+                                  w:w + window_size[2]]
+                    for d, h, w in batch_positions
+                ])
+                
+                if fixed_batch and batch.shape[0] < batch_size:
+                    batch = F.pad(batch, (0, 0, 0, 0, 0, 0, 0, 0, 0, batch_size - batch.shape[0]))
+                
+                batch_pred = self._forward(batch)[:, 0]
+                
+                for pred, (d, h, w) in zip(batch_pred, batch_positions):
+                    region = (slice(d, d + window_size[0]),
+                              slice(h, h + window_size[1]),
+                              slice(w, w + window_size[2]))
+                    output[region] += pred * importance
+                    weights[region] += importance
+            
+            # Normalize and crop padding
+            output /= weights
+            output = output[:volume_shape[0], :volume_shape[1], :volume_shape[2]]
+            
+            if keep_on_device:
+                return output
+            
+            return output.cpu().numpy()
+    
+    def _importance_map(self, window_size: Tuple[int, int, int]) -> torch.Tensor:
+        """Gaussian importance map favouring window centers (sigma = 1/8 window)"""
+        if self._importance_cache is not None and self._importance_cache[0] == window_size:
+            return self._importance_cache[1]
+        
+        importance = torch.ones(window_size, dtype=torch.float32)
+        for axis, size in enumerate(window_size):
+            coords = torch.arange(size, dtype=torch.float32) - (size - 1) / 2.0
+            gaussian = torch.exp(-0.5 * (coords / (size / 8.0)) ** 2)
+            shape = [1, 1, 1]
+            shape[axis] = size
+            importance = importance * gaussian.view(shape)
+        
+        importance /= importance.max()
+        # Avoid zero weights at window borders
+        importance.clamp_(min=importance[importance > 0].min().item())
+        importance = importance.to(self.device)
+        
+        self._importance_cache = (window_size, importance)
+        return importance
     
     def test_time_augmentation(self, volume_tensor: torch.Tensor) -> np.ndarray:
         """Test Time Augmentation"""
@@ -679,11 +982,28 @@ class PostProcessor:
     
     def __init__(self, config: InferenceConfig):
         self.config = config
+        
+        # Array backend: NumPy/SciPy, or CuPy/cupyx on GPU
+        self.xp = np
+        self.ndi = ndimage
+        
+        if config.gpu_postprocessing:
+            try:
+                import cupy
+                import cupyx.scipy.ndimage as cupy_ndimage
+                
+                self.xp = cupy
+                self.ndi = cupy_ndimage
+                logger.info("Postprocessing on GPU (CuPy)")
+            except ImportError:
+                logger.warning("CuPy not available, postprocessing on CPU")
     
-    def process(self, mask: np.ndarray, metadata: Dict) -> np.ndarray:
+    def process(self, mask: Union[np.ndarray, torch.Tensor], metadata: Dict) -> np.ndarray:
         """Complete post-processing pipeline"""
+        mask = self._to_backend(mask)
+        
         # 1. Threshold
-        binary_mask = (mask > 0.5).astype(np.uint8)
+        binary_mask = self._threshold(mask)
         
         # 2. Remove small components
         if self.config.remove_small_components:
@@ -704,84 +1024,95 @@ class PostProcessor:
         # 6. Ensure volume constraints
         binary_mask = self._apply_volume_constraints(binary_mask, metadata)
         
+        # Only the final uint8 mask leaves the GPU
+        if self.xp is not np:
+            binary_mask = self.xp.asnumpy(binary_mask)
+        
+        return binary_mask
+    
+    def _to_backend(self, mask: Union[np.ndarray, torch.Tensor]):
+        """Move the probability map to the active backend (zero-copy via DLPack on GPU)"""
+        if isinstance(mask, torch.Tensor):
+            if self.xp is not np and mask.is_cuda:
+                return self.xp.from_dlpack(mask.detach().contiguous())
+            mask = mask.detach().cpu().numpy()
+        
+        return self.xp.asarray(mask)
+    
+    def _threshold(self, array, threshold: float = 0.5):
+        """Threshold straight into a uint8 mask (no intermediate bool array)"""
+        binary_mask = self.xp.empty(array.shape, dtype=self.xp.uint8)
+        self.xp.greater(array, threshold, out=binary_mask, casting='unsafe')
         return binary_mask
     
     def _remove_small_components(self, mask: np.ndarray) -> np.ndarray:
         """Remove small disconnected components"""
-        labeled_mask, num_labels = ndimage.label(mask)
+        if not mask.any():
+            return mask
+        
+        # 6-connectivity: smallest neighbourhood, cheapest labelling pass
+        structure = self.ndi.generate_binary_structure(3, 1)
+        labeled_mask, num_labels = self.ndi.label(mask, structure=structure)
         
         if num_labels <= 1:
             return mask
         
         # Calculate component sizes
-        component_sizes = np.bincount(labeled_mask.ravel())
-        
-        # Find the largest component
-        largest_component = np.argmax(component_sizes[1:]) + 1
+        component_sizes = self.xp.bincount(labeled_mask.ravel())
         
-        # Create mask with only the largest component
-        cleaned_mask = np.zeros_like(mask)
-        cleaned_mask[labeled_mask == largest_component] = 1
+        # Keep the largest component and all components above threshold
+        keep = component_sizes >= self.config.min_component_size_voxels
+        keep[self.xp.argmax(component_sizes[1:]) + 1] = True
+        keep[0] = False
         
-        # Also keep other components above threshold
-        for label in range(1, num_labels + 1):
-            if label != largest_component:
-                if component_sizes[label] >= self.config.min_component_size_voxels:
-                    cleaned_mask[labeled_mask == label] = 1
-        
-        return cleaned_mask
+        # Single lookup instead of one comparison pass per label
+        return keep[labeled_mask].astype(self.xp.uint8)
     
     def _fill_holes(self, mask: np.ndarray) -> np.ndarray:
         """Fill holes in the segmentation"""
-        # Use morphological reconstruction
-        from scipy import ndimage
+        # Fill holes in 2D for each slice: a 3D structure with no connectivity
+        # along z keeps the filling in-plane while running as a single C call
+        structure = self.xp.zeros((3, 3, 3), dtype=bool)
+        structure[1] = self.ndi.generate_binary_structure(2, 1)
         
-        # Fill holes in 2D for each slice
-        filled_mask = np.zeros_like(mask)
+        filled_mask = self.ndi.binary_fill_holes(mask, structure=structure)
         
-        for z in range(mask.shape[0]):
-            slice_2d = mask[z]
-            
-            # Find holes
-            filled_slice = ndimage.binary_fill_holes(slice_2d).astype(np.uint8)
+        # Only keep holes below certain size
+        if self.config.max_hole_size_voxels > 0:
+            holes = filled_mask & (mask == 0)
+            labeled_holes, num_holes = self.ndi.label(holes, structure=structure)
             
-            # Only keep holes below certain size
-            if self.config.max_hole_size_voxels > 0:
-                holes = filled_slice - slice_2d
-                labeled_holes, num_holes = ndimage.label(holes)
-                
-                for hole_idx in range(1, num_holes + 1):
-                    hole_size = np.sum(labeled_holes == hole_idx)
-                    if hole_size > self.config.max_hole_size_voxels:
-                        filled_slice[labeled_holes == hole_idx] = 0
-            
-            filled_mask[z] = filled_slice
+            if num_holes > 0:
+                hole_sizes = self.xp.bincount(labeled_holes.ravel())
+                too_large = hole_sizes > self.config.max_hole_size_voxels
+                too_large[0] = False
+                filled_mask[too_large[labeled_holes]] = False
         
-        return filled_mask
+        return filled_mask.astype(self.xp.uint8)
     
     def _morphological_closing(self, mask: np.ndarray) -> np.ndarray:
         """Apply morphological closing"""
-        structure = ndimage.generate_binary_structure(3, 1)
+        structure = self.ndi.generate_binary_structure(3, 1)
         
         # Apply 3D closing
-        closed = ndimage.binary_closing(
+        closed = self.ndi.binary_closing(
             mask,
             structure=structure,
             iterations=1
-        ).astype(np.uint8)
+        ).astype(self.xp.uint8)
         
         return closed
     
     def _smooth_boundaries(self, mask: np.ndarray) -> np.ndarray:
         """Smooth segmentation boundaries"""
         # Apply Gaussian smoothing
-        smoothed = ndimage.gaussian_filter(
-            mask.astype(np.float32),
+        smoothed = self.ndi.gaussian_filter(
+            mask.astype(self.xp.float32),
             sigma=self.config.smoothing_sigma
         )
         
         # Re-threshold
-        smoothed = (smoothed > 0.5).astype(np.uint8)
+        smoothed = self._threshold(smoothed)
         
         return smoothed
     
@@ -789,7 +1120,7 @@ class PostProcessor:
         """Apply volume-based constraints"""
         # Calculate current volume
         voxel_volume_ml = np.prod(metadata['spacing']) / 1000.0
-        current_volume_ml = np.sum(mask) * voxel_volume_ml
+        current_volume_ml = int(self.xp.count_nonzero(mask)) * voxel_volume_ml
         
         # Check if volume is reasonable
         if (current_volume_ml < self.config.min_liver_volume_ml or
@@ -813,42 +1144,42 @@ class PostProcessor:
     def _grow_mask(self, mask: np.ndarray, metadata: Dict) -> np.ndarray:
         """Grow mask to reach minimum volume"""
         target_voxels = int(self.config.min_liver_volume_ml / (np.prod(metadata['spacing']) / 1000.0))
-        current_voxels = np.sum(mask)
+        current_voxels = int(self.xp.count_nonzero(mask))
         
         if current_voxels >= target_voxels:
             return mask
         
         # Use dilation
-        structure = ndimage.generate_binary_structure(3, 1)
+        structure = self.ndi.generate_binary_structure(3, 1)
         
         grown = mask.copy()
         iterations = 0
         
-        while np.sum(grown) < target_voxels and iterations < 10:
-            grown = ndimage.binary_dilation(grown, structure=structure)
+        while int(self.xp.count_nonzero(grown)) < target_voxels and iterations < 10:
+            grown = self.ndi.binary_dilation(grown, structure=structure)
             iterations += 1
         
-        return grown.astype(np.uint8)
+        return grown.astype(self.xp.uint8)
     
     def _shrink_mask(self, mask: np.ndarray, metadata: Dict) -> np.ndarray:
         """Shrink mask to reach maximum volume"""
         target_voxels = int(self.config.max_liver_volume_ml / (np.prod(metadata['spacing']) / 1000.0))
-        current_voxels = np.sum(mask)
+        current_voxels = int(self.xp.count_nonzero(mask))
         
         if current_voxels <= target_voxels:
             return mask
         
         # Use erosion
-        structure = ndimage.generate_binary_structure(3, 1)
+        structure = self.ndi.generate_binary_structure(3, 1)
         
         shrunk = mask.copy()
         iterations = 0
         
-        while np.sum(shrunk) > target_voxels and iterations < 10:
-            shrunk = ndimage.binary_erosion(shrunk, structure=structure)
+        while int(self.xp.count_nonzero(shrunk)) > target_voxels and iterations < 10:
+            shrunk = self.ndi.binary_erosion(shrunk, structure=structure)
             iterations += 1
         
-        return shrunk.astype(np.uint8)
+        return shrunk.astype(self.xp.uint8)
 
 
 class ResultsExporter:
@@ -857,6 +1188,14 @@ class ResultsExporter:
     def __init__(self, config: InferenceConfig):
         self.config = config
     
+    @staticmethod
+    def load_mask(mask_path: Union[str, Path]) -> np.ndarray:
+        """Load a mask written by export() from segmentation_mask.npz"""
+        with np.load(mask_path) as data:
+            shape = tuple(int(dim) for dim in data['shape'])
+            mask = np.unpackbits(data['packed'], count=int(np.prod(shape)))
+        return mask.reshape(shape)
+    
     def export(self, mask: np.ndarray, metadata: Dict, output_dir: Path) -> Dict:
         """Export results in all requested formats"""
         output_dir.mkdir(parents=True, exist_ok=True)
@@ -867,15 +1206,15 @@ class ResultsExporter:
         result_dir = output_dir / result_id
         result_dir.mkdir(exist_ok=True)
         
-        # Save mask as numpy array
-        mask_path = result_dir / "segmentation_mask.npy"
-        np.save(mask_path, mask)
-        export_paths['mask_npy'] = str(mask_path)
+        # Save mask as bit-packed, compressed numpy archive (see load_mask)
+        mask_path = result_dir / "segmentation_mask.npz"
+        packed = np.packbits(mask.astype(bool, copy=False))
+        np.savez_compressed(mask_path, packed=packed, shape=np.array(mask.shape, dtype=np.int64))
+        export_paths['mask_npz'] = str(mask_path)
         
         # Save metadata
         metadata_path = result_dir / "metadata.json"
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2, default=str)
+        _write_json(metadata_path, metadata)
         export_paths['metadata'] = str(metadata_path)
         
         # Export in requested formats
@@ -911,18 +1250,15 @@ class ResultsExporter:
     
     def _generate_result_id(self, metadata: Dict) -> str:
         """Generate unique result ID"""
-        import hashlib
-        import uuid
-        
         # Use patient ID and study UID if available
         if 'patient_id' in metadata and 'study_instance_uid' in metadata:
             base_str = f"{metadata['patient_id']}_{metadata['study_instance_uid']}"
             hash_str = hashlib.md5(base_str.encode()).hexdigest()[:12]
             return f"liver_seg_{hash_str}"
         
-        # Otherwise use timestamp and random UUID
+        # Otherwise use timestamp and random suffix (32 bits, same as before)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        random_id = uuid.uuid4().hex[:8]
+        random_id = os.urandom(4).hex()
         return f"liver_seg_{timestamp}_{random_id}"
     
     def _export_nifti(self, mask: np.ndarray, metadata: Dict, output_dir: Path) -> Path:
@@ -1137,7 +1473,7 @@ class ResultsExporter:
         import matplotlib.pyplot as plt
         
         # Find middle slice with liver
-        axial_slices = np.where(np.sum(mask, axis=(1, 2)) > 0)[0]
+        axial_slices = np.flatnonzero(np.count_nonzero(mask, axis=(1, 2)))
         
         if len(axial_slices) == 0:
             slice_idx = mask.shape[0] // 2
@@ -1232,11 +1568,9 @@ class ResultsExporter:
     def _export_report(self, mask: np.ndarray, metadata: Dict, 
                       export_paths: Dict, output_dir: Path) -> Path:
         """Export summary report"""
-        import json
-        
         # Calculate basic statistics
         voxel_volume_ml = np.prod(metadata['spacing']) / 1000.0
-        liver_voxels = np.sum(mask)
+        liver_voxels = np.count_nonzero(mask)
         liver_volume_ml = liver_voxels * voxel_volume_ml
         
         # Create report
@@ -1249,7 +1583,7 @@ class ResultsExporter:
                 'study_date': metadata.get('study_date', '')
             },
             'segmentation_info': {
-                'volume_ml': round(liver_volume_ml, 2),
+                'volume_ml': liver_volume_ml,
                 'voxel_count': int(liver_voxels),
                 'mask_shape': mask.shape,
                 'spacing': metadata.get('spacing', [1.0, 1.0, 1.0])
@@ -1265,8 +1599,7 @@ class ResultsExporter:
         
         # Save report
         report_path = output_dir / "report.json"
-        with open(report_path, 'w') as f:
-            json.dump(report, f, indent=2, default=str)
+        _write_json(report_path, report)
         
         return report_path
 
@@ -1323,112 +1656,38 @@ class AdvancedLiverSegmentationInference:
         self._current_job = str(dicom_path)
         
         try:
-            start_time = time.time()
+            start_time = time.perf_counter_ns()
             logger.info(f"Starting segmentation for: {dicom_path}")
             
-            # Step 1: Load DICOM
-            logger.info("Step 1/6: Loading DICOM...")
-            load_start = time.time()
-            volume, metadata = self.dicom_loader.load(dicom_path)
-            load_time = time.time() - load_start
-            
-            logger.info(f"  Loaded volume: {volume.shape}, spacing: {metadata.get('spacing')}")
-            logger.info(f"  Load time: {load_time:.2f}s")
-            
-            # Step 2: Preprocess
-            logger.info("Step 2/6: Preprocessing...")
-            preprocess_start = time.time()
-            volume_tensor = self.preprocessor.preprocess(volume, metadata)
-            preprocess_time = time.time() - preprocess_start
-            
-            logger.info(f"  Preprocess time: {preprocess_time:.2f}s")
+            # Steps 1-2: Load DICOM and preprocess
+            volume_tensor, metadata, timing = self._load_study(dicom_path)
             
             # Step 3: Inference
             logger.info("Step 3/6: Running inference...")
-            inference_start = time.time()
-            
-            if self.config.sliding_window:
-                probability_map = self.model_manager.sliding_window_inference(volume_tensor)
-            elif self.config.tta:
-                probability_map = self.model_manager.test_time_augmentation(volume_tensor)
-            else:
-                probability_map = self.model_manager.predict(volume_tensor)
-            
-            inference_time = time.time() - inference_start
-            
-            logger.info(f"  Inference time: {inference_time:.2f}s")
-            
-            # Step 4: Postprocessing
-            logger.info("Step 4/6: Postprocessing...")
-            postprocess_start = time.time()
-            segmentation_mask = self.postprocessor.process(probability_map, metadata)
-            postprocess_time = time.time() - postprocess_start
+            inference_start = time.perf_counter_ns()
+            probability_map = self._run_inference(volume_tensor)
+            timing['inference'] = (time.perf_counter_ns() - inference_start) / 1e9
             
-            # Calculate liver volume
-            voxel_volume_ml = np.prod(metadata['spacing']) / 1000.0
-            liver_volume_ml = np.sum(segmentation_mask) * voxel_volume_ml
+            logger.info(f"  Inference time: {timing['inference']:.2f}s")
             
-            logger.info(f"  Postprocess time: {postprocess_time:.2f}s")
-            logger.info(f"  Liver volume: {liver_volume_ml:.1f} ml")
-            
-            # Step 5: Quality check
-            logger.info("Step 5/6: Quality check...")
-            quality_check = self._perform_quality_check(segmentation_mask, metadata)
-            
-            if not quality_check['passed']:
-                logger.warning(f"  Quality check failed: {quality_check['issues']}")
-            else:
-                logger.info("  Quality check passed")
+            # Steps 4-5: Postprocessing and quality check
+            segmentation_mask, liver_volume_ml, quality_check, timing['postprocess'] = \
+                self._postprocess_study(probability_map, metadata)
             
             # Step 6: Export results
-            logger.info("Step 6/6: Exporting results...")
-            export_start = time.time()
-            
-            if output_dir is None:
-                output_dir = Path("segmentation_results")
-            else:
-                output_dir = Path(output_dir)
-            
-            export_paths = self.exporter.export(segmentation_mask, metadata, output_dir)
-            export_time = time.time() - export_start
-            
-            # Calculate metrics if ground truth provided
-            metrics = None
-            if ground_truth is not None:
-                logger.info("Calculating metrics against ground truth...")
-                from .metrics import SegmentationMetrics, MetricConfig
-                
-                metrics_config = MetricConfig(spacing=metadata['spacing'])
-                metrics_calc = SegmentationMetrics(metrics_config)
-                metrics = metrics_calc.calculate_all_metrics(ground_truth, segmentation_mask)
+            export_paths, metrics, timing['export'] = self._export_study(
+                segmentation_mask, metadata, output_dir, ground_truth
+            )
             
             # Total time
-            total_time = time.time() - start_time
-            
-            # Prepare results
-            results = {
-                'success': True,
-                'segmentation_mask': segmentation_mask,
-                'probability_map': probability_map if self.config.save_probability_map else None,
-                'metadata': metadata,
-                'timing': {
-                    'total': total_time,
-                    'load': load_time,
-                    'preprocess': preprocess_time,
-                    'inference': inference_time,
-                    'postprocess': postprocess_time,
-                    'export': export_time
-                },
-                'volume_ml': round(liver_volume_ml, 2),
-                'quality_check': quality_check,
-                'export_paths': export_paths,
-                'metrics': metrics
-            }
+            timing['total'] = (time.perf_counter_ns() - start_time) / 1e9
             
-            logger.info(f"Segmentation completed in {total_time:.2f}s")
-            logger.info(f"Results saved to: {output_dir}")
+            logger.info(f"Segmentation completed in {timing['total']:.2f}s")
             
-            return results
+            return self._build_results(
+                segmentation_mask, probability_map, metadata, timing,
+                liver_volume_ml, quality_check, export_paths, metrics
+            )
             
         except Exception as e:
             logger.error(f"Segmentation failed: {e}")
@@ -1443,16 +1702,135 @@ class AdvancedLiverSegmentationInference:
         finally:
             self._current_job = None
     
+    def _load_study(self, dicom_path: Union[str, Path]) -> Tuple[torch.Tensor, Dict, Dict]:
+        """Steps 1-2: load DICOM and preprocess into a model input tensor"""
+        logger.info("Step 1/6: Loading DICOM...")
+        load_start = time.perf_counter_ns()
+        volume, metadata = self.dicom_loader.load(dicom_path)
+        load_time = (time.perf_counter_ns() - load_start) / 1e9
+        
+        logger.info(f"  Loaded volume: {volume.shape}, spacing: {metadata.get('spacing')}")
+        logger.info(f"  Load time: {load_time:.2f}s")
+        
+        logger.info("Step 2/6: Preprocessing...")
+        preprocess_start = time.perf_counter_ns()
+        volume_tensor = self.preprocessor.preprocess(volume, metadata)
+        preprocess_time = (time.perf_counter_ns() - preprocess_start) / 1e9
+        
+        logger.info(f"  Preprocess time: {preprocess_time:.2f}s")
+        
+        return volume_tensor, metadata, {'load': load_time, 'preprocess': preprocess_time}
+    
+    def _run_inference(self, volume_tensor: torch.Tensor) -> Union[np.ndarray, torch.Tensor]:
+        """Step 3: run the configured inference strategy"""
+        # GPU postprocessing consumes the probability map directly from device memory
+        keep_on_device = self.postprocessor.xp is not np and self.model_manager.device.type == 'cuda'
+        
+        if self.config.sliding_window:
+            return self.model_manager.sliding_window_inference(volume_tensor, keep_on_device)
+        elif self.config.tta:
+            return self.model_manager.test_time_augmentation(volume_tensor)
+        else:
+            return self.model_manager.predict(volume_tensor, keep_on_device)
+    
+    def _postprocess_study(self, probability_map: Union[np.ndarray, torch.Tensor],
+                           metadata: Dict) -> Tuple[np.ndarray, float, Dict, float]:
+        """Steps 4-5: postprocess the probability map and check quality"""
+        logger.info("Step 4/6: Postprocessing...")
+        postprocess_start = time.perf_counter_ns()
+        segmentation_mask = self.postprocessor.process(probability_map, metadata)
+        postprocess_time = (time.perf_counter_ns() - postprocess_start) / 1e9
+        
+        # Calculate liver volume
+        voxel_volume_ml = np.prod(metadata['spacing']) / 1000.0
+        liver_volume_ml = np.count_nonzero(segmentation_mask) * voxel_volume_ml
+        
+        logger.info(f"  Postprocess time: {postprocess_time:.2f}s")
+        logger.info(f"  Liver volume: {liver_volume_ml:.1f} ml")
+        
+        logger.info("Step 5/6: Quality check...")
+        quality_check = self._perform_quality_check(segmentation_mask, metadata)
+        
+        if not quality_check['passed']:
+            logger.warning(f"  Quality check failed: {quality_check['issues']}")
+        else:
+            logger.info("  Quality check passed")
+        
+        return segmentation_mask, liver_volume_ml, quality_check, postprocess_time
+    
+    def _export_study(self, segmentation_mask: np.ndarray, metadata: Dict,
+                      output_dir: Union[str, Path] = None,
+                      ground_truth: np.ndarray = None) -> Tuple[Dict, Optional[Dict], float]:
+        """Step 6: export results and compute metrics against ground truth"""
+        logger.info("Step 6/6: Exporting results...")
+        export_start = time.perf_counter_ns()
+        
+        if output_dir is None:
+            output_dir = Path("segmentation_results")
+        else:
+            output_dir = Path(output_dir)
+        
+        export_paths = self.exporter.export(segmentation_mask, metadata, output_dir)
+        export_time = (time.perf_counter_ns() - export_start) / 1e9
+        
+        logger.info(f"Results saved to: {output_dir}")
+        
+        # Calculate metrics if ground truth provided
+        metrics = None
+        if ground_truth is not None:
+            logger.info("Calculating metrics against ground truth...")
+            from .metrics import SegmentationMetrics, MetricConfig
+            
+            metrics_config = MetricConfig(spacing=metadata['spacing'])
+            metrics_calc = SegmentationMetrics(metrics_config)
+            metrics = metrics_calc.calculate_all_metrics(ground_truth, segmentation_mask)
+        
+        return export_paths, metrics, export_time
+    
+    def _build_results(self, segmentation_mask: np.ndarray,
+                       probability_map: Union[np.ndarray, torch.Tensor],
+                       metadata: Dict, timing: Dict, liver_volume_ml: float,
+                       quality_check: Dict, export_paths: Dict,
+                       metrics: Optional[Dict]) -> Dict:
+        """Assemble the result dictionary for a processed study"""
+        if isinstance(probability_map, torch.Tensor) and self.config.save_probability_map:
+            probability_map = probability_map.cpu().numpy()
+        
+        return {
+            'success': True,
+            'segmentation_mask': segmentation_mask,
+            'probability_map': probability_map if self.config.save_probability_map else None,
+            'metadata': metadata,
+            'timing': {
+                'total': timing['total'],
+                'load': timing['load'],
+                'preprocess': timing['preprocess'],
+                'inference': timing['inference'],
+                'postprocess': timing['postprocess'],
+                'export': timing['export']
+            },
+            'volume_ml': liver_volume_ml,
+            'quality_check': quality_check,
+            'export_paths': export_paths,
+            'metrics': metrics
+        }
+    
     def process_batch(self, dicom_paths: List[Union[str, Path]],
                      output_base_dir: Union[str, Path] = None,
                      max_workers: int = None) -> List[Dict]:
         """
         Process multiple DICOM studies in batch
         
+        The batch runs as a three-stage pipeline: a loader thread reads and
+        preprocesses the next studies (up to two ahead) while the main thread
+        runs inference and postprocessing, and export workers write results
+        in the background. On CUDA the loaded volume is pinned and uploaded on
+        a side stream so the host-to-device copy overlaps with inference.
+        
         Args:
             dicom_paths: List of paths to DICOM files/directories
             output_base_dir: Base output directory
-            max_workers: Maximum number of parallel workers
+            max_workers: Maximum number of parallel export workers
         
         Returns:
             List of results for each study
@@ -1468,44 +1846,132 @@ class AdvancedLiverSegmentationInference:
         if max_workers is None:
             max_workers = self.config.num_workers
         
-        # Use ThreadPoolExecutor for I/O bound tasks
+        device = self.model_manager.device
+        upload_stream = torch.cuda.Stream(device) if device.type == 'cuda' else None
+        
+        load_queue = queue.Queue(maxsize=2)
+        stop_loading = threading.Event()
+        
+        def load_worker():
+            for dicom_path in dicom_paths:
+                if stop_loading.is_set() or not self._running:
+                    break
+                
+                try:
+                    volume_tensor, metadata, timing = self._load_study(dicom_path)
+                    upload_event = None
+                    
+                    if upload_stream is not None:
+                        with torch.cuda.stream(upload_stream):
+                            volume_tensor = volume_tensor.pin_memory().to(device, non_blocking=True)
+                        upload_event = torch.cuda.Event()
+                        upload_event.record(upload_stream)
+                    
+                    load_queue.put((dicom_path, (volume_tensor, metadata, timing, upload_event), None))
+                except Exception as e:
+                    load_queue.put((dicom_path, None, e))
+            
+            load_queue.put(None)
+        
+        def export_job(study_output_dir, segmentation_mask, probability_map, metadata,
+                       timing, liver_volume_ml, quality_check):
+            export_paths, metrics, timing['export'] = self._export_study(
+                segmentation_mask, metadata, study_output_dir
+            )
+            timing['total'] = sum(timing.values())
+            
+            return self._build_results(
+                segmentation_mask, probability_map, metadata, timing,
+                liver_volume_ml, quality_check, export_paths, metrics
+            )
+        
+        loader = threading.Thread(target=load_worker, name="dicom-loader", daemon=True)
+        loader.start()
+        
+        futures = []
+        
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
+            i = 0
             
-            for i, dicom_path in enumerate(dicom_paths):
-                if not self._running:
-                    logger.info("Batch processing interrupted")
+            while True:
+                item = load_queue.get()
+                if item is None:
                     break
                 
+                dicom_path, loaded, error = item
+                
                 # Create output directory for this study
                 if output_base_dir:
                     study_output_dir = Path(output_base_dir) / f"study_{i:04d}"
                 else:
                     study_output_dir = None
+                i += 1
                 
-                # Submit job
-                future = executor.submit(
-                    self.process,
-                    dicom_path,
-                    study_output_dir
-                )
-                futures.append((dicom_path, future))
+                if not self._running:
+                    logger.info("Batch processing interrupted")
+                    stop_loading.set()
+                    continue
+                
+                if error is not None:
+                    logger.error(f"Failed to process {dicom_path}: {error}")
+                    futures.append((dicom_path, None, error))
+                    continue
+                
+                self._current_job = str(dicom_path)
+                
+                try:
+                    volume_tensor, metadata, timing, upload_event = loaded
+                    
+                    if upload_event is not None:
+                        torch.cuda.current_stream(device).wait_event(upload_event)
+                        volume_tensor.record_stream(torch.cuda.current_stream(device))
+                    
+                    inference_start = time.perf_counter_ns()
+                    probability_map = self._run_inference(volume_tensor)
+                    timing['inference'] = (time.perf_counter_ns() - inference_start) / 1e9
+                    del volume_tensor
+                    
+                    segmentation_mask, liver_volume_ml, quality_check, timing['postprocess'] = \
+                        self._postprocess_study(probability_map, metadata)
+                    
+                    if not self.config.save_probability_map:
+                        probability_map = None  # release the (possibly GPU) buffer early
+                    
+                    # Export runs in the background while the next study is processed
+                    future = executor.submit(
+                        export_job, study_output_dir, segmentation_mask, probability_map,
+                        metadata, timing, liver_volume_ml, quality_check
+                    )
+                    futures.append((dicom_path, future, None))
+                    
+                except Exception as e:
+                    logger.error(f"Failed to process {dicom_path}: {e}")
+                    futures.append((dicom_path, None, e))
+                
+                finally:
+                    self._current_job = None
             
             # Collect results
-            for dicom_path, future in futures:
+            for dicom_path, future, error in futures:
                 try:
+                    if error is not None:
+                        raise error
+                    
                     result = future.result(timeout=3600)  # 1 hour timeout
                     results.append(result)
-                    
-                    if not result['success']:
-                        failed.append((dicom_path, result['error']))
                         
                 except Exception as e:
-                    logger.error(f"Failed to process {dicom_path}: {e}")
+                    results.append({
+                        'success': False,
+                        'error': str(e),
+                        'traceback': ''.join(traceback.format_exception(type(e), e, e.__traceback__))
+                    })
                     failed.append((dicom_path, str(e)))
         
+        loader.join()
+        
         # Summary
-        logger.info(f"Batch processing complete: {len(results)} successful, {len(failed)} failed")
+        logger.info(f"Batch processing complete: {len(results) - len(failed)} successful, {len(failed)} failed")
         
         if failed:
             logger.warning("Failed studies:")
@@ -1520,7 +1986,7 @@ class AdvancedLiverSegmentationInference:
         passed = True
         
         # Check if any liver is segmented
-        liver_voxels = np.sum(mask)
+        liver_voxels = np.count_nonzero(mask)
         
         if liver_voxels == 0:
             issues.append("No liver segmented")
@@ -1574,7 +2040,7 @@ class AdvancedLiverSegmentationInference:
             'passed': passed,
             'issues': issues,
             'liver_voxels': int(liver_voxels),
-            'liver_volume_ml': round(liver_volume_ml, 2),
+            'liver_volume_ml': liver_volume_ml,
             'components': num_components
         }
     
@@ -1647,6 +2113,10 @@ Examples:
                        help='Overlap between windows (0.0-1.0)')
     parser.add_argument('--tta', action='store_true',
                        help='Enable test time augmentation')
+    parser.add_argument('--compile', action='store_true',
+                       help='Compile the model with torch.compile')
+    parser.add_argument('--cuda-graphs', action='store_true',
+                       help='Capture CUDA graphs per input shape')
     
     # Postprocessing
     parser.add_argument('--min-volume', type=float, default=200.0,
@@ -1655,6 +2125,8 @@ Examples:
                        help='Maximum liver volume in ml')
     parser.add_argument('--no-smoothing', action='store_true',
                        help='Disable smoothing')
+    parser.add_argument('--gpu-postprocessing', action='store_true',
+                       help='Run postprocessing on GPU (requires CuPy)')
     
     # Output
     parser.add_argument('--output', '-o', default='segmentation_results',
@@ -1694,10 +2166,13 @@ Examples:
         window_size=tuple(args.window_size),
         window_overlap=args.window_overlap,
         tta=args.tta,
+        compile_model=args.compile,
+        cuda_graphs=args.cuda_graphs,
         
         min_liver_volume_ml=args.min_volume,
         max_liver_volume_ml=args.max_volume,
         smoothing=not args.no_smoothing,
+        gpu_postprocessing=args.gpu_postprocessing,
         
         output_formats=args.formats,
         save_screenshots=not args.no_screenshots,
@@ -1725,21 +2200,20 @@ Examples:
         
         # Save batch summary
         summary_path = Path(args.output) / "batch_summary.json"
-        with open(summary_path, 'w') as f:
-            json.dump({
-                'total': len(args.input),
-                'successful': successful,
-                'failed': failed,
-                'results': [
-                    {
-                        'input': str(args.input[i]),
-                        'success': r.get('success', False),
-                        'volume_ml': r.get('volume_ml', 0),
-                        'error': r.get('error', None) if not r.get('success', False) else None
-                    }
-                    for i, r in enumerate(results)
-                ]
-            }, f, indent=2)
+        _write_json(summary_path, {
+            'total': len(args.input),
+            'successful': successful,
+            'failed': failed,
+            'results': [
+                {
+                    'input': str(args.input[i]),
+                    'success': r.get('success', False),
+                    'volume_ml': r.get('volume_ml', 0),
+                    'error': r.get('error', None) if not r.get('success', False) else None
+                }
+                for i, r in enumerate(results)
+            ]
+        })
         
         if failed > 0:
             sys.exit(1)
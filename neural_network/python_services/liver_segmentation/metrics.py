@@ -24,9 +24,62 @@ import time
 from scipy import ndimage
 from scipy.spatial.distance import directed_hausdorff
 
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
 # Типы для аннотаций
 ArrayLike = Union[np.ndarray, List, Tuple]
 
+# Таблица popcount для NumPy < 2.0, где нет np.bitwise_count
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _pack(mask: np.ndarray) -> np.ndarray:
+    """
+    Упаковка бинарной маски в биты (8 вокселей на байт)
+    
+    Результат дополняется нулями до кратности 8 байтам и возвращается как
+    uint64, чтобы popcount обрабатывал по 64 вокселя за операцию.
+    """
+    packed = np.packbits(mask, axis=None)
+    pad = (-packed.size) % 8
+    if pad:
+        packed = np.concatenate([packed, np.zeros(pad, dtype=np.uint8)])
+    return packed.view(np.uint64)
+
+
+# Размер (в вокселях), начиная с которого confusion matrix считается Numba-ядром
+_NUMBA_MIN_SIZE = 16_000_000
+
+if njit is not None:
+    @njit(parallel=True, boundscheck=False, cache=True, fastmath=True)
+    def _confusion_kernel(gt_flat, pred_flat):
+        """Многопоточный подсчет TP, FP, FN за один проход по плоским маскам"""
+        tp = 0
+        fp = 0
+        fn = 0
+        for i in prange(gt_flat.size):
+            g = gt_flat[i] != 0
+            p = pred_flat[i] != 0
+            if g and p:
+                tp += 1
+            elif p:
+                fp += 1
+            elif g:
+                fn += 1
+        return tp, fp, fn
+else:
+    _confusion_kernel = None
+
+
+def _popcount(packed: np.ndarray) -> int:
+    """Количество установленных битов в упакованной маске"""
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(packed).sum(dtype=np.int64))
+    return int(_POPCOUNT_TABLE[packed.view(np.uint8)].sum(dtype=np.int64))
+
 
 class MetricCategory(Enum):
     """Категории метрик"""
@@ -84,11 +137,44 @@ class SegmentationMetrics:
         self._execution_times = {}
         
     def _ensure_binary(self, arr: ArrayLike) -> np.ndarray:
-        """Преобразование в бинарную маску"""
-        arr = np.asarray(arr, dtype=np.float32)
+        """Преобразование в бинарную маску (bool, 1 байт на воксель)"""
+        arr = np.asarray(arr)
+        if arr.dtype == np.bool_:
+            return arr
         if self.config.is_binary:
-            return (arr > self.config.threshold).astype(np.uint8)
-        return arr
+            return arr > self.config.threshold
+        return arr.astype(np.float32, copy=False)
+    
+    def _binary_stats(self, gt: np.ndarray, pred: np.ndarray) -> Tuple[int, int, int, int]:
+        """
+        Элементы confusion matrix (TP, FP, FN, TN) для бинарных масок
+        
+        Маски упаковываются в биты (в 8 раз меньше памяти, чем bool), после
+        чего пересечение и размеры масок считаются через popcount. Остальные
+        величины выводятся алгебраически. Для очень больших объемов при
+        наличии Numba используется многопоточное ядро.
+        """
+        if gt.dtype != np.bool_:
+            gt = gt == 1
+        if pred.dtype != np.bool_:
+            pred = pred == 1
+        
+        if _confusion_kernel is not None and gt.size > _NUMBA_MIN_SIZE:
+            tp, fp, fn = _confusion_kernel(gt.reshape(-1), pred.reshape(-1))
+            tp, fp, fn = int(tp), int(fp), int(fn)
+            return tp, fp, fn, gt.size - tp - fp - fn
+        
+        packed_gt = _pack(gt)
+        packed_pred = _pack(pred)
+        
+        tp = _popcount(np.bitwise_and(packed_gt, packed_pred))
+        gt_size = _popcount(packed_gt)
+        pred_size = _popcount(packed_pred)
+        
+        fp = pred_size - tp
+        fn = gt_size - tp
+        tn = gt.size - tp - fp - fn
+        return tp, fp, fn, tn
     
     def _validate_inputs(self, ground_truth: ArrayLike, prediction: ArrayLike) -> None:
         """Валидация входных данных"""
@@ -138,9 +224,15 @@ class SegmentationMetrics:
         gt = self._ensure_binary(ground_truth)
         pred = self._ensure_binary(prediction)
         
-        intersection = np.sum(gt * pred)
-        gt_sum = np.sum(gt)
-        pred_sum = np.sum(pred)
+        if self.config.is_binary:
+            tp, fp, fn, _ = self._binary_stats(gt, pred)
+            intersection = tp
+            gt_sum = tp + fn
+            pred_sum = tp + fp
+        else:
+            intersection = np.sum(gt * pred)
+            gt_sum = np.sum(gt)
+            pred_sum = np.sum(pred)
         
         dice = (2.0 * intersection + self.config.epsilon) / (gt_sum + pred_sum + self.config.epsilon)
         return float(dice)
@@ -163,8 +255,13 @@ class SegmentationMetrics:
         gt = self._ensure_binary(ground_truth)
         pred = self._ensure_binary(prediction)
         
-        intersection = np.sum(gt * pred)
-        union = np.sum(gt) + np.sum(pred) - intersection
+        if self.config.is_binary:
+            tp, fp, fn, _ = self._binary_stats(gt, pred)
+            intersection = tp
+            union = tp + fp + fn
+        else:
+            intersection = np.sum(gt * pred)
+            union = np.sum(gt) + np.sum(pred) - intersection
         
         iou = (intersection + self.config.epsilon) / (union + self.config.epsilon)
         return float(iou)
@@ -204,10 +301,14 @@ class SegmentationMetrics:
         """
         self._validate_inputs(ground_truth, prediction)
         
-        gt = self._ensure_binary(ground_truth).astype(np.float32)
-        pred = self._ensure_binary(prediction).astype(np.float32)
+        gt = self._ensure_binary(ground_truth)
+        pred = self._ensure_binary(prediction)
         
-        mae = np.mean(np.abs(gt - pred))
+        if self.config.is_binary:
+            # Для бинарных масок |y_true - y_pred| = y_true XOR y_pred
+            mae = np.count_nonzero(gt ^ pred) / gt.size
+        else:
+            mae = np.mean(np.abs(gt - pred))
         return float(mae)
     
     def mean_squared_error(self, ground_truth: ArrayLike, prediction: ArrayLike) -> float:
@@ -225,10 +326,14 @@ class SegmentationMetrics:
         """
         self._validate_inputs(ground_truth, prediction)
         
-        gt = self._ensure_binary(ground_truth).astype(np.float32)
-        pred = self._ensure_binary(prediction).astype(np.float32)
+        gt = self._ensure_binary(ground_truth)
+        pred = self._ensure_binary(prediction)
         
-        mse = np.mean((gt - pred) ** 2)
+        if self.config.is_binary:
+            # Для бинарных масок (y_true - y_pred)² = y_true XOR y_pred
+            mse = np.count_nonzero(gt ^ pred) / gt.size
+        else:
+            mse = np.mean((gt - pred) ** 2)
         return float(mse)
     
     def root_mean_squared_error(self, ground_truth: ArrayLike, prediction: ArrayLike) -> float:
@@ -263,7 +368,7 @@ class SegmentationMetrics:
         mae = self.mean_absolute_error(ground_truth, prediction)
         gt = self._ensure_binary(ground_truth)
         
-        value_range = np.max(gt) - np.min(gt)
+        value_range = float(np.max(gt)) - float(np.min(gt))
         if value_range == 0:
             return 0.0
         
@@ -458,12 +563,19 @@ class SegmentationMetrics:
         gt = self._ensure_binary(ground_truth)
         pred = self._ensure_binary(prediction)
         
-        voxel_volume_mm3 = np.prod(self.config.spacing)
-        voxel_volume_ml = voxel_volume_mm3 / 1000.0
+        # Количество вокселей (для мягких масок - сумма вероятностей)
+        if gt.dtype == np.bool_:
+            gt_voxels = np.count_nonzero(gt)
+            pred_voxels = np.count_nonzero(pred)
+        else:
+            gt_voxels = np.sum(gt)
+            pred_voxels = np.sum(pred)
         
-        # Количество вокселей
-        gt_voxels = np.sum(gt)
-        pred_voxels = np.sum(pred)
+        return self._volume_metrics_from_counts(gt_voxels, pred_voxels)
+    
+    def _volume_metrics_from_counts(self, gt_voxels, pred_voxels) -> Dict[str, float]:
+        """Объемные метрики по количеству вокселей в масках"""
+        voxel_volume_mm3 = np.prod(self.config.spacing)
         
         # Объемы
         gt_volume_mm3 = gt_voxels * voxel_volume_mm3
@@ -504,8 +616,10 @@ class SegmentationMetrics:
         Returns:
             Коэффициент сходства объемов [0, 1]
         """
-        volume_metrics = self.volume_metrics(ground_truth, prediction)
-        
+        return self._volume_similarity_from_metrics(self.volume_metrics(ground_truth, prediction))
+    
+    def _volume_similarity_from_metrics(self, volume_metrics: Dict[str, float]) -> float:
+        """Сходство объемов по готовым объемным метрикам"""
         v_gt = volume_metrics['volume_gt_ml']
         v_pred = volume_metrics['volume_pred_ml']
         
@@ -536,11 +650,21 @@ class SegmentationMetrics:
         pred = self._ensure_binary(prediction)
         
         # Вычисляем TP, TN, FP, FN
-        tp = np.sum((gt == 1) & (pred == 1))
-        tn = np.sum((gt == 0) & (pred == 0))
-        fp = np.sum((gt == 0) & (pred == 1))
-        fn = np.sum((gt == 1) & (pred == 0))
-        
+        if self.config.is_binary:
+            tp, fp, fn, tn = self._binary_stats(gt, pred)
+        else:
+            # Мягкие маски: положительными считаются воксели со значением 1
+            gt_positive = gt == 1
+            pred_positive = pred == 1
+            tp = np.count_nonzero(gt_positive & pred_positive)
+            fp = np.count_nonzero(pred_positive) - tp
+            fn = np.count_nonzero(gt_positive) - tp
+            tn = gt.size - tp - fp - fn
+        
+        return self._confusion_metrics_from_stats(tp, fp, fn, tn)
+    
+    def _confusion_metrics_from_stats(self, tp: int, fp: int, fn: int, tn: int) -> Dict[str, float]:
+        """Клинические метрики по элементам confusion matrix"""
         # Чувствительность (Recall, True Positive Rate)
         sensitivity = tp / (tp + fn + self.config.epsilon)
         
@@ -561,7 +685,7 @@ class SegmentationMetrics:
         
         # Коэффициент корреляции Мэттьюса (бинарный случай)
         mcc_numerator = (tp * tn) - (fp * fn)
-        mcc_denominator = np.sqrt((tp + fp) * (tp + fn) * (tn + fp) * (tn + fn))
+        mcc_denominator = np.sqrt(float(tp + fp) * float(tp + fn) * float(tn + fp) * float(tn + fn))
         mcc = mcc_numerator / (mcc_denominator + self.config.epsilon)
         
         return {
@@ -603,8 +727,8 @@ class SegmentationMetrics:
         pred_boundary = self._get_boundary_region(pred)
         
         # Вычисляем IoU для границ
-        intersection = np.sum(gt_boundary & pred_boundary)
-        union = np.sum(gt_boundary | pred_boundary)
+        intersection = np.count_nonzero(gt_boundary & pred_boundary)
+        union = np.count_nonzero(gt_boundary | pred_boundary)
         
         boundary_iou = intersection / (union + self.config.epsilon)
         return float(boundary_iou)
@@ -617,7 +741,7 @@ class SegmentationMetrics:
         # Выделяем границы
         structure = ndimage.generate_binary_structure(3, 1)
         eroded = ndimage.binary_erosion(mask, structure=structure)
-        boundary = mask ^ eroded
+        boundary = mask.astype(bool, copy=False) ^ eroded
         
         # Применяем дилатацию для расширения граничного региона
         if dilation > 0:
@@ -644,6 +768,10 @@ class SegmentationMetrics:
         hd95 = self.hausdorff_distance_95(ground_truth, prediction)
         volume_metrics = self.volume_metrics(ground_truth, prediction)
         
+        return self._quality_from_values(dice, hd95, volume_metrics['volume_pred_ml'])
+    
+    def _quality_from_values(self, dice: float, hd95: float, volume_ml: float) -> Dict[str, any]:
+        """Клиническая оценка по уже рассчитанным Dice, HD95 и объему"""
         # Определяем качество на основе Dice
         if dice >= 0.95:
             quality_grade = "Excellent"
@@ -662,7 +790,6 @@ class SegmentationMetrics:
             clinical_acceptable = False
         
         # Проверка объема печени
-        volume_ml = volume_metrics['volume_pred_ml']
         if volume_ml < self.config.min_liver_volume_ml:
             volume_warning = "Volume too small"
             clinical_acceptable = False
@@ -698,6 +825,11 @@ class SegmentationMetrics:
         """
         Расчет всех метрик
         
+        Маски бинаризуются один раз, confusion matrix считается за один
+        проход, а overlap, статистические, объемные и клинические метрики
+        выводятся из нее алгебраически. При is_binary=False метрики
+        считаются по отдельности теми же методами, что и вне этого вызова.
+        
         Args:
             ground_truth: Истинная маска
             prediction: Предсказанная маска
@@ -710,102 +842,99 @@ class SegmentationMetrics:
         start_total = time.perf_counter()
         
         try:
-            # 1. Overlap Metrics
-            if verbose:
-                print("Calculating overlap metrics...")
+            self._validate_inputs(ground_truth, prediction)
             
-            results['dice'], time_dice = self._timed_execution(
-                self.dice_coefficient, ground_truth, prediction
-            )
-            results['iou'], time_iou = self._timed_execution(
-                self.jaccard_index, ground_truth, prediction
-            )
-            results['volume_overlap_error'], time_voe = self._timed_execution(
-                self.volume_overlap_error, ground_truth, prediction
-            )
+            # Маски бинаризуются один раз и переиспользуются всеми метриками
+            gt = self._ensure_binary(ground_truth)
+            pred = self._ensure_binary(prediction)
+            eps = self.config.epsilon
             
-            # 2. Statistical Metrics
+            # 1. Confusion matrix за один проход, остальное выводится алгебраически
             if verbose:
-                print("Calculating statistical metrics...")
+                print("Calculating confusion matrix...")
             
-            results['mae'], time_mae = self._timed_execution(
-                self.mean_absolute_error, ground_truth, prediction
-            )
-            results['mse'], time_mse = self._timed_execution(
-                self.mean_squared_error, ground_truth, prediction
-            )
-            results['rmse'], time_rmse = self._timed_execution(
-                self.root_mean_squared_error, ground_truth, prediction
-            )
-            results['normalized_mae'], time_nmae = self._timed_execution(
-                self.normalized_mae, ground_truth, prediction
-            )
+            if self.config.is_binary:
+                (tp, fp, fn, tn), time_confusion = self._timed_execution(
+                    self._binary_stats, gt, pred
+                )
+                total = tp + fp + fn + tn
+                gt_voxels = tp + fn
+                
+                # 2. Overlap Metrics
+                results['dice'] = float((2.0 * tp + eps) / (2.0 * tp + fp + fn + eps))
+                results['iou'] = float((tp + eps) / (tp + fp + fn + eps))
+                results['volume_overlap_error'] = 1.0 - results['iou']
+                
+                # 3. Statistical Metrics (для бинарных масок MAE = MSE = доля несовпадений)
+                results['mae'] = float((fp + fn) / total)
+                results['mse'] = results['mae']
+                results['rmse'] = float(np.sqrt(results['mse']))
+                has_range = 0 < gt_voxels < total
+                results['normalized_mae'] = results['mae'] if has_range else 0.0
+            else:
+                # Мягкие маски: те же формулы, что и в отдельных методах
+                start_soft = time.perf_counter()
+                results['dice'] = self.dice_coefficient(gt, pred)
+                results['iou'] = self.jaccard_index(gt, pred)
+                results['volume_overlap_error'] = 1.0 - results['iou']
+                results['mae'] = self.mean_absolute_error(gt, pred)
+                results['mse'] = self.mean_squared_error(gt, pred)
+                results['rmse'] = float(np.sqrt(results['mse']))
+                results['normalized_mae'] = self.normalized_mae(gt, pred)
+                time_confusion = time.perf_counter() - start_soft
             
-            # 3. Distance Metrics
+            # 4. Distance Metrics
             if verbose:
                 print("Calculating distance metrics...")
             
             results['hausdorff_distance'], time_hd = self._timed_execution(
-                self.hausdorff_distance, ground_truth, prediction
+                self.hausdorff_distance, gt, pred
             )
             results['hausdorff_distance_95'], time_hd95 = self._timed_execution(
-                self.hausdorff_distance_95, ground_truth, prediction
+                self.hausdorff_distance_95, gt, pred
             )
             results['average_surface_distance'], time_asd = self._timed_execution(
-                self.average_surface_distance, ground_truth, prediction
+                self.average_surface_distance, gt, pred
             )
             
-            # 4. Volume Metrics
-            if verbose:
-                print("Calculating volume metrics...")
-            
-            volume_results, time_volume = self._timed_execution(
-                self.volume_metrics, ground_truth, prediction
-            )
+            # 5. Volume Metrics
+            if self.config.is_binary:
+                volume_results = self._volume_metrics_from_counts(gt_voxels, tp + fp)
+            else:
+                volume_results = self.volume_metrics(gt, pred)
             results.update(volume_results)
+            results['volume_similarity'] = self._volume_similarity_from_metrics(volume_results)
             
-            results['volume_similarity'], time_vs = self._timed_execution(
-                self.volume_similarity, ground_truth, prediction
-            )
-            
-            # 5. Clinical Metrics
-            if verbose:
-                print("Calculating clinical metrics...")
-            
-            clinical_results, time_clinical = self._timed_execution(
-                self.confusion_matrix_metrics, ground_truth, prediction
-            )
-            results.update(clinical_results)
+            # 6. Clinical Metrics
+            if self.config.is_binary:
+                results.update(self._confusion_metrics_from_stats(tp, fp, fn, tn))
+            else:
+                results.update(self.confusion_matrix_metrics(gt, pred))
             
-            # 6. Boundary Metrics
+            # 7. Boundary Metrics
             if verbose:
                 print("Calculating boundary metrics...")
             
             results['boundary_iou'], time_boundary = self._timed_execution(
-                self.boundary_iou, ground_truth, prediction
+                self.boundary_iou, gt, pred
             )
             
-            # 7. Quality Assessment
-            if verbose:
-                print("Performing quality assessment...")
-            
-            quality_results, time_quality = self._timed_execution(
-                self.clinical_quality_assessment, ground_truth, prediction
-            )
-            results.update(quality_results)
+            # 8. Quality Assessment
+            results.update(self._quality_from_values(
+                results['dice'],
+                results['hausdorff_distance_95'],
+                volume_results['volume_pred_ml']
+            ))
             
-            # 8. Execution Times
+            # 9. Execution Times
             if verbose:
                 total_time = time.perf_counter() - start_total
                 execution_times = {
-                    'dice': time_dice,
-                    'iou': time_iou,
-                    'mae': time_mae,
-                    'mse': time_mse,
+                    'confusion': time_confusion,
+                    'hd': time_hd,
                     'hd95': time_hd95,
                     'asd': time_asd,
-                    'volume': time_volume,
-                    'clinical': time_clinical,
+                    'boundary': time_boundary,
                     'total': total_time
                 }
                 results['execution_times'] = execution_times
@@ -991,6 +1120,39 @@ class SegmentationMetrics:
         return {'class': 'poor', 'text': 'Poor'}
 
 
+# ===========================================================================
+# ФУНКЦИОНАЛЬНЫЙ ИНТЕРФЕЙС
+# ===========================================================================
+
+def calculate_dice(ground_truth: ArrayLike, prediction: ArrayLike) -> float:
+    """Коэффициент Dice с конфигурацией по умолчанию"""
+    return SegmentationMetrics().dice_coefficient(ground_truth, prediction)
+
+
+def calculate_iou(ground_truth: ArrayLike, prediction: ArrayLike) -> float:
+    """Индекс Жаккара (IoU) с конфигурацией по умолчанию"""
+    return SegmentationMetrics().jaccard_index(ground_truth, prediction)
+
+
+def calculate_all_metrics(ground_truth: ArrayLike, prediction: ArrayLike,
+                          spacing: Tuple[float, float, float] = (1.0, 1.0, 1.0),
+                          verbose: bool = False) -> Dict[str, any]:
+    """
+    Расчет всех метрик для пары масок
+    
+    Args:
+        ground_truth: Истинная маска
+        prediction: Предсказанная маска
+        spacing: Размер вокселя (z, y, x) в мм
+        verbose: Выводить информацию о времени выполнения
+    
+    Returns:
+        Словарь со всеми метриками
+    """
+    metrics = SegmentationMetrics(MetricConfig(spacing=spacing))
+    return metrics.calculate_all_metrics(ground_truth, prediction, verbose=verbose)
+
+
 # ===========================================================================
 # ПРИМЕР ИСПОЛЬЗОВАНИЯ
 # ===========================================================================
@@ -1005,24 +1167,22 @@ def main():
     np.random.seed(42)
     shape = (64, 128, 128)
     
-    # Ground truth - сферическая область
-    gt = np.zeros(shape, dtype=np.float32)
+    # Ground truth - сферическая область (сравниваем квадраты расстояний, без sqrt)
     center = np.array(shape) // 2
     radius = 30
     
     z, y, x = np.ogrid[:shape[0], :shape[1], :shape[2]]
-    distance = np.sqrt((z - center[0])**2 + (y - center[1])**2 + (x - center[2])**2)
-    gt[distance <= radius] = 1.0
+    distance_sq = (z - center[0])**2 + (y - center[1])**2 + (x - center[2])**2
+    gt = (distance_sq <= radius**2).astype(np.float32)
     
     # Prediction - слегка смещенная и искаженная область
-    pred = np.zeros(shape, dtype=np.float32)
     center_pred = center + np.array([2, 3, -1])
     radius_pred = radius - 2
     
-    distance_pred = np.sqrt((z - center_pred[0])**2 + 
-                           (y - center_pred[1])**2 + 
-                           (x - center_pred[2])**2)
-    pred[distance_pred <= radius_pred] = 1.0
+    distance_pred_sq = ((z - center_pred[0])**2 + 
+                        (y - center_pred[1])**2 + 
+                        (x - center_pred[2])**2)
+    pred = (distance_pred_sq <= radius_pred**2).astype(np.float32)
     
     # Добавляем немного шума
     noise = np.random.randn(*shape) * 0.1
@@ -11,9 +11,12 @@ Features:
 - Оптимизация для медицинских изображений с поддержкой разных модальностей
 """
 
+import os
+import subprocess
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from torch.nn.utils.fusion import fuse_conv_bn_eval
 import numpy as np
 from typing import List, Tuple, Optional, Dict, Union
 from dataclasses import dataclass
@@ -32,6 +35,7 @@ class ConvType(Enum):
     DENSE = "dense"
     INCEPTION = "inception"
     DILATED = "dilated"
+    SEPARABLE = "separable"  # Вторая свертка depthwise + pointwise (энкодер и декодер)
 
 
 class UpsampleType(Enum):
@@ -92,6 +96,11 @@ class ModelConfig:
     # Инициализация
     init_method: str = "kaiming_normal"
     
+    # Ожидаемая форма входа [D, H, W]: размеры декодера вычисляются заранее,
+    # и для нее выравнивание skip connection во время прохода не нужно
+    # (входы другой формы выравниваются как обычно)
+    input_shape: Optional[Tuple[int, int, int]] = None
+    
     def __post_init__(self):
         if self.use_group_norm or self.use_instance_norm:
             self.use_batch_norm = False
@@ -338,15 +347,25 @@ class DoubleConv3D(nn.Module):
         elif conv_type == ConvType.INCEPTION:
             self.conv1 = InceptionConv3D(in_channels, out_channels)
             self.conv2 = InceptionConv3D(out_channels, out_channels)
-        else:  # STANDARD или DILATED
+        else:  # STANDARD, DILATED или SEPARABLE
             dilation = 2 if conv_type == ConvType.DILATED else 1
             self.conv1 = nn.Conv3d(in_channels, out_channels,
                                   kernel_size=kernel_size,
                                   padding=padding, dilation=dilation)
             self.bn1 = nn.BatchNorm3d(out_channels)
-            self.conv2 = nn.Conv3d(out_channels, out_channels,
-                                  kernel_size=kernel_size,
-                                  padding=padding, dilation=dilation)
+            if conv_type == ConvType.SEPARABLE:
+                # Depthwise 3x3x3 + pointwise 1x1x1: то же рецептивное поле
+                # при примерно kernel_size^3 меньшем числе операций
+                self.conv2 = nn.Sequential(
+                    nn.Conv3d(out_channels, out_channels,
+                             kernel_size=kernel_size, padding=padding,
+                             groups=out_channels, bias=False),
+                    nn.Conv3d(out_channels, out_channels, kernel_size=1)
+                )
+            else:
+                self.conv2 = nn.Conv3d(out_channels, out_channels,
+                                      kernel_size=kernel_size,
+                                      padding=padding, dilation=dilation)
             self.bn2 = nn.BatchNorm3d(out_channels)
             self.dropout = nn.Dropout3d(dropout) if dropout > 0 else nn.Identity()
         
@@ -416,12 +435,26 @@ class Up3D(nn.Module):
     
     def __init__(self, in_channels: int, out_channels: int,
                  upsample_type: UpsampleType = UpsampleType.TRANSPOSE,
-                 attention_type: AttentionType = AttentionType.NONE):
+                 attention_type: AttentionType = AttentionType.NONE,
+                 output_padding: Optional[Tuple[int, int, int]] = None,
+                 skip_size: Optional[Tuple[int, int, int]] = None,
+                 conv_type: ConvType = ConvType.STANDARD):
         super(Up3D, self).__init__()
         
         self.upsample_type = upsample_type
         self.attention_type = attention_type
         
+        # Режим интерполяции (None для обучаемого upsampling'а)
+        self.interpolation_mode = {
+            UpsampleType.TRILINEAR: 'trilinear',
+            UpsampleType.BILINEAR: 'bilinear',
+            UpsampleType.NEAREST: 'nearest',
+        }.get(upsample_type)
+        
+        # Размер skip connection для входа формы ModelConfig.input_shape;
+        # используется, только когда модель подтвердила форму входа
+        self.skip_size = tuple(skip_size) if skip_size is not None else None
+        
         # Механизм внимания для skip connection
         if attention_type == AttentionType.ATTENTION_GATE:
             self.attention_gate = AttentionGate3D(in_channels // 2,
@@ -431,7 +464,8 @@ class Up3D(nn.Module):
         # Метод повышения дискретизации
         if upsample_type == UpsampleType.TRANSPOSE:
             self.up = nn.ConvTranspose3d(in_channels, in_channels // 2,
-                                        kernel_size=2, stride=2)
+                                        kernel_size=2, stride=2,
+                                        output_padding=output_padding or 0)
         elif upsample_type == UpsampleType.PIXELSHUFFLE:
             self.up = nn.Sequential(
                 nn.Conv3d(in_channels, in_channels // 2 * 8,
@@ -442,16 +476,15 @@ class Up3D(nn.Module):
             self.up = nn.Identity()
         
         self.conv = DoubleConv3D(in_channels, out_channels,
+                                conv_type=conv_type,
                                 attention_type=attention_type)
     
-    def forward(self, x1: torch.Tensor, x2: torch.Tensor) -> torch.Tensor:
+    def forward(self, x1: torch.Tensor, x2: torch.Tensor,
+                static_shape: bool = False) -> torch.Tensor:
         # Upsample
-        if self.upsample_type in [UpsampleType.BILINEAR,
-                                  UpsampleType.TRILINEAR,
-                                  UpsampleType.NEAREST]:
-            mode = 'trilinear' if self.upsample_type == UpsampleType.TRILINEAR else \
-                   'bilinear' if self.upsample_type == UpsampleType.BILINEAR else 'nearest'
-            x1 = F.interpolate(x1, size=x2.shape[2:], mode=mode, align_corners=True)
+        if self.interpolation_mode is not None:
+            size = self.skip_size if static_shape and self.skip_size is not None else x2.shape[2:]
+            x1 = F.interpolate(x1, size=size, mode=self.interpolation_mode, align_corners=True)
         else:
             x1 = self.up(x1)
         
@@ -459,12 +492,13 @@ class Up3D(nn.Module):
         if self.attention_type == AttentionType.ATTENTION_GATE:
             x2 = self.attention_gate(x1, x2)
         
-        # Совмещение размерностей
-        diffD = x2.size()[2] - x1.size()[2]
-        diffH = x2.size()[3] - x1.size()[3]
-        diffW = x2.size()[4] - x1.size()[4]
-        
-        if diffD > 0 or diffH > 0 or diffW > 0:
+        # Совмещение размерностей: при входе формы input_shape размеры уже
+        # совпадают; для других форм x1 дополняется (или обрезается) до x2
+        if x1.shape[2:] != x2.shape[2:]:
+            diffD = x2.size()[2] - x1.size()[2]
+            diffH = x2.size()[3] - x1.size()[3]
+            diffW = x2.size()[4] - x1.size()[4]
+            
             x1 = F.pad(x1, [diffW // 2, diffW - diffW // 2,
                            diffH // 2, diffH - diffH // 2,
                            diffD // 2, diffD - diffD // 2])
@@ -577,12 +611,23 @@ class AdvancedUNet3D(nn.Module):
         self.decoders = nn.ModuleList()
         self.attention_gates = nn.ModuleList()
         
+        geometry = self._decoder_geometry()
+        self.input_shape = tuple(self.config.input_shape) if self.config.input_shape is not None else None
+        
+        # Раздельные свертки в декодере только для ConvType.SEPARABLE; для
+        # остальных типов декодер стандартный (совместимость чекпоинтов)
+        decoder_conv_type = (ConvType.SEPARABLE if self.config.conv_type == ConvType.SEPARABLE
+                             else ConvType.STANDARD)
+        
         for i in reversed(range(self.depth)):
             self.decoders.append(
                 Up3D(features[i + 1] * 2 if i == self.depth - 1 else features[i + 1],
                      features[i],
                      upsample_type=self.config.upsample_type,
-                     attention_type=self.config.attention_type)
+                     attention_type=self.config.attention_type,
+                     output_padding=geometry[i][1],
+                     skip_size=geometry[i][0],
+                     conv_type=decoder_conv_type)
             )
         
         # Deep supervision outputs
@@ -605,9 +650,33 @@ class AdvancedUNet3D(nn.Module):
         else:
             self.activation = nn.Softmax(dim=1)
         
+        # Возвращать логиты без активации (активация/порог применяются снаружи)
+        self.output_logits = False
+        
         # Инициализация весов
         self._initialize_weights()
     
+    def _decoder_geometry(self) -> List[Tuple[Optional[Tuple[int, int, int]],
+                                              Optional[Tuple[int, int, int]]]]:
+        """
+        Размер skip connection и output_padding для каждого уровня декодера
+        
+        Пулинг округляет размер вниз, поэтому на уровне с нечетным размером
+        удвоение дает на 1 воксель меньше размера skip connection; разница
+        компенсируется output_padding транспонированной свертки.
+        Без input_shape (или для PixelShuffle) размеры выравниваются во время прохода.
+        """
+        if self.config.input_shape is None or \
+                self.config.upsample_type == UpsampleType.PIXELSHUFFLE:
+            return [(None, None)] * self.depth
+        
+        sizes = [tuple(self.config.input_shape)]
+        for _ in range(self.depth):
+            sizes.append(tuple(size // 2 for size in sizes[-1]))
+        
+        return [(sizes[i], tuple(skip - 2 * low for skip, low in zip(sizes[i], sizes[i + 1])))
+                for i in range(self.depth)]
+    
     def _initialize_weights(self):
         """Инициализация весов модели"""
         for m in self.modules():
@@ -633,6 +702,9 @@ class AdvancedUNet3D(nn.Module):
     
     def forward(self, x: torch.Tensor) -> Union[torch.Tensor, List[torch.Tensor]]:
         """Прямой проход через сеть"""
+        # Заранее вычисленные размеры декодера верны только для input_shape
+        static_shape = self.input_shape is not None and tuple(x.shape[2:]) == self.input_shape
+        
         # Encoder path
         encoder_outputs = []
         for encoder in self.encoders:
@@ -647,17 +719,20 @@ class AdvancedUNet3D(nn.Module):
         x = bottleneck
         
         for i, decoder in enumerate(self.decoders):
-            x = decoder(x, encoder_outputs[-(i + 2)])
+            x = decoder(x, encoder_outputs[-(i + 2)], static_shape)
             decoder_outputs.append(x)
         
         # Deep supervision outputs
         if self.deep_supervision:
             ds_outputs = []
             for i, ds_conv in enumerate(self.ds_outputs):
-                ds_outputs.append(self.activation(ds_conv(decoder_outputs[i])))
+                ds_output = ds_conv(decoder_outputs[i])
+                ds_outputs.append(ds_output if self.output_logits else self.activation(ds_output))
         
         # Final output
-        final_output = self.activation(self.final_conv(x))
+        final_output = self.final_conv(x)
+        if not self.output_logits:
+            final_output = self.activation(final_output)
         
         if self.deep_supervision:
             return final_output, ds_outputs
@@ -673,6 +748,310 @@ class AdvancedUNet3D(nn.Module):
         return sum(p.numel() for p in self.parameters() if p.requires_grad)
 
 
+def fuse_conv_bn(model: nn.Module) -> nn.Module:
+    """
+    Свертка BatchNorm3d в веса предшествующей Conv3d для инференса
+    
+    В режиме eval BatchNorm - фиксированное аффинное преобразование, поэтому
+    его можно внести в веса и смещение свертки. Слитые BN заменяются на
+    nn.Identity. DenseConv3D не затрагивается: в нем BN стоит перед сверткой.
+    
+    Args:
+        model: Модель в режиме eval (изменяется на месте)
+    
+    Returns:
+        Та же модель
+    """
+    if model.training:
+        raise ValueError("Conv-BN fusion requires the model in eval mode")
+    
+    fused = 0
+    for module in list(model.modules()):
+        if isinstance(module, nn.Sequential):
+            for i in range(len(module) - 1):
+                if isinstance(module[i], nn.Conv3d) and isinstance(module[i + 1], nn.BatchNorm3d):
+                    module[i] = fuse_conv_bn_eval(module[i], module[i + 1])
+                    module[i + 1] = nn.Identity()
+                    fused += 1
+        
+        elif isinstance(module, (DoubleConv3D, ResidualConv3D)):
+            for conv_name, bn_name in (('conv1', 'bn1'), ('conv2', 'bn2')):
+                conv = getattr(module, conv_name, None)
+                bn = getattr(module, bn_name, None)
+                if not isinstance(bn, nn.BatchNorm3d):
+                    continue
+                
+                if isinstance(conv, nn.Conv3d):
+                    setattr(module, conv_name, fuse_conv_bn_eval(conv, bn))
+                elif isinstance(conv, nn.Sequential) and isinstance(conv[-1], nn.Conv3d):
+                    # Разделимая свертка: BN сливается с pointwise сверткой
+                    conv[-1] = fuse_conv_bn_eval(conv[-1], bn)
+                else:
+                    continue
+                
+                setattr(module, bn_name, nn.Identity())
+                fused += 1
+    
+    logger.info(f"Fused {fused} Conv3d+BatchNorm3d pairs")
+    return model
+
+
+def export_onnx(model: nn.Module, onnx_path: str,
+                input_shape: Tuple[int, ...] = (1, 1, 128, 128, 128),
+                opset_version: int = 17,
+                dynamic: bool = True,
+                output_name: str = 'logits') -> str:
+    """
+    Экспорт модели в ONNX с динамическими осями batch/D/H/W
+    
+    Args:
+        model: Модель в режиме eval
+        onnx_path: Путь к ONNX файлу
+        input_shape: Форма тестового входа [B, C, D, H, W]
+        opset_version: Версия opset
+        dynamic: Динамические оси (иначе граф фиксирован под input_shape)
+        output_name: Имя выхода ('logits' или 'probs', по виду выхода модели)
+    
+    Returns:
+        Путь к ONNX файлу
+    """
+    device = next(model.parameters()).device
+    dummy = torch.zeros(input_shape, device=device)
+    dynamic_axes = None
+    if dynamic:
+        dynamic_axes = {name: {0: 'batch', 2: 'depth', 3: 'height', 4: 'width'}
+                        for name in ('volume', output_name)}
+    
+    with torch.no_grad():
+        torch.onnx.export(
+            model, dummy, onnx_path,
+            opset_version=opset_version,
+            input_names=['volume'],
+            output_names=[output_name],
+            dynamic_axes=dynamic_axes
+        )
+    
+    logger.info(f"Exported ONNX model to {onnx_path}")
+    return onnx_path
+
+
+def _create_int8_calibrator(trt, volumes: List[np.ndarray],
+                            input_shape: Tuple[int, ...], cache_path: str):
+    """
+    Калибратор IInt8EntropyCalibrator2 для пост-тренировочной INT8 квантизации
+    
+    Объемы должны быть нормализованы так же, как при инференсе; каждый
+    обрезается/дополняется нулями по центру до input_shape[2:].
+    """
+    
+    class EntropyCalibrator(trt.IInt8EntropyCalibrator2):
+        def __init__(self):
+            super().__init__()
+            self.volumes = list(volumes)
+            self.index = 0
+            self.device_input = torch.zeros(input_shape, dtype=torch.float32, device='cuda')
+        
+        def get_batch_size(self):
+            return input_shape[0]
+        
+        def get_batch(self, names):
+            if self.index >= len(self.volumes):
+                return None
+            
+            volume = self.volumes[self.index]
+            self.index += 1
+            
+            # Центральная обрезка / дополнение до формы профиля
+            target = input_shape[2:]
+            fitted = np.zeros(target, dtype=np.float32)
+            src = tuple(slice(max((s - t) // 2, 0), max((s - t) // 2, 0) + min(s, t))
+                        for s, t in zip(volume.shape, target))
+            dst = tuple(slice(max((t - s) // 2, 0), max((t - s) // 2, 0) + min(s, t))
+                        for s, t in zip(volume.shape, target))
+            fitted[dst] = volume[src]
+            
+            self.device_input.copy_(torch.from_numpy(fitted).expand(input_shape))
+            return [int(self.device_input.data_ptr())]
+        
+        def read_calibration_cache(self):
+            if cache_path and os.path.exists(cache_path):
+                with open(cache_path, 'rb') as f:
+                    return f.read()
+            return None
+        
+        def write_calibration_cache(self, cache):
+            if cache_path:
+                with open(cache_path, 'wb') as f:
+                    f.write(cache)
+    
+    return EntropyCalibrator()
+
+
+class TensorRTEngine:
+    """
+    Обертка над сериализованным TensorRT движком
+    
+    Движок строится из ONNX для фиксированной формы входа (бакета) и
+    кэшируется на диске; ключ кэша включает вид выхода (логиты или
+    вероятности), форму, точность и версию TensorRT.
+    Входы и выходы передаются как torch тензоры на GPU.
+    """
+    
+    def __init__(self, engine_path: str, device: str = 'cuda'):
+        import tensorrt as trt
+        
+        self.engine_path = engine_path
+        self.device = torch.device(device)
+        self.trt_logger = trt.Logger(trt.Logger.WARNING)
+        
+        with open(engine_path, 'rb') as f:
+            runtime = trt.Runtime(self.trt_logger)
+            self.engine = runtime.deserialize_cuda_engine(f.read())
+        
+        self.context = self.engine.create_execution_context()
+        self.tensor_names = [self.engine.get_tensor_name(i)
+                             for i in range(self.engine.num_io_tensors)]
+        self.input_names = [name for name in self.tensor_names
+                            if self.engine.get_tensor_mode(name) == trt.TensorIOMode.INPUT]
+        self.output_names = [name for name in self.tensor_names
+                             if self.engine.get_tensor_mode(name) == trt.TensorIOMode.OUTPUT]
+    
+    @property
+    def input_shape(self) -> Tuple[int, ...]:
+        """Форма входа [B, C, D, H, W] (для движков с фиксированной формой)"""
+        return tuple(self.engine.get_tensor_shape(self.input_names[0]))
+    
+    @staticmethod
+    def cache_path(cache_dir: str, input_shape: Tuple[int, ...], precision: str,
+                   output_kind: str = 'logits') -> str:
+        """
+        Путь к движку в кэше: вид выхода ('logits' или 'probs') + форма
+        бакета + точность + версия TensorRT
+        """
+        import tensorrt as trt
+        
+        shape_key = 'x'.join(str(dim) for dim in input_shape)
+        return os.path.join(cache_dir,
+                            f"unet3d_{output_kind}_{shape_key}_{precision}_trt{trt.__version__}.engine")
+    
+    @classmethod
+    def build(cls, onnx_path: str, engine_path: str,
+              input_shape: Tuple[int, ...],
+              precision: str = 'fp16',
+              calibration_volumes: Optional[List[np.ndarray]] = None,
+              calibration_cache: Optional[str] = None,
+              workspace_gb: float = 4.0,
+              device: str = 'cuda') -> 'TensorRTEngine':
+        """
+        Сборка движка из ONNX
+        
+        Args:
+            onnx_path: Путь к ONNX модели
+            engine_path: Куда сохранить сериализованный движок
+            input_shape: Форма входа [B, C, D, H, W] (профиль оптимизации)
+            precision: 'fp32', 'fp16' или 'int8'
+            calibration_volumes: Нормализованные объемы для INT8 калибровки
+            calibration_cache: Файл кэша калибровки
+            workspace_gb: Лимит рабочей памяти TensorRT
+            device: Устройство
+        """
+        import tensorrt as trt
+        
+        trt_logger = trt.Logger(trt.Logger.WARNING)
+        builder = trt.Builder(trt_logger)
+        
+        flags = 0
+        if hasattr(trt.NetworkDefinitionCreationFlag, 'EXPLICIT_BATCH'):
+            flags = 1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH)
+        network = builder.create_network(flags)
+        
+        parser = trt.OnnxParser(network, trt_logger)
+        with open(onnx_path, 'rb') as f:
+            if not parser.parse(f.read()):
+                errors = [str(parser.get_error(i)) for i in range(parser.num_errors)]
+                raise RuntimeError(f"Failed to parse ONNX model: {errors}")
+        
+        config = builder.create_builder_config()
+        config.set_memory_pool_limit(trt.MemoryPoolType.WORKSPACE, int(workspace_gb * (1 << 30)))
+        
+        # Профиль специализирован под один бакет формы
+        profile = builder.create_optimization_profile()
+        profile.set_shape(network.get_input(0).name, input_shape, input_shape, input_shape)
+        config.add_optimization_profile(profile)
+        
+        if precision in ('fp16', 'int8'):
+            config.set_flag(trt.BuilderFlag.FP16)
+        
+        if precision == 'int8':
+            if not calibration_volumes and not (calibration_cache and os.path.exists(calibration_cache)):
+                raise ValueError("INT8 precision requires calibration volumes or a calibration cache")
+            
+            config.set_flag(trt.BuilderFlag.INT8)
+            config.int8_calibrator = _create_int8_calibrator(
+                trt, calibration_volumes or [], input_shape, calibration_cache
+            )
+            config.set_calibration_profile(profile)
+        
+        serialized = builder.build_serialized_network(network, config)
+        if serialized is None:
+            raise RuntimeError("TensorRT engine build failed")
+        
+        os.makedirs(os.path.dirname(os.path.abspath(engine_path)), exist_ok=True)
+        with open(engine_path, 'wb') as f:
+            f.write(serialized)
+        
+        logger.info(f"Built TensorRT {precision} engine for {tuple(input_shape)}: {engine_path}")
+        return cls(engine_path, device)
+    
+    @classmethod
+    def build_with_trtexec(cls, onnx_path: str, engine_path: str,
+                           input_shape: Tuple[int, ...],
+                           fp16: bool = True,
+                           device: str = 'cuda') -> 'TensorRTEngine':
+        """
+        Сборка движка утилитой trtexec (из поставки TensorRT)
+        
+        Args:
+            onnx_path: Путь к ONNX модели
+            engine_path: Куда сохранить сериализованный движок
+            input_shape: Форма входа [B, C, D, H, W]
+            fp16: Разрешить FP16 ядра
+            device: Устройство
+        """
+        shape_key = 'x'.join(str(dim) for dim in input_shape)
+        command = ['trtexec', f'--onnx={onnx_path}', f'--saveEngine={engine_path}',
+                   f'--shapes=volume:{shape_key}']
+        if fp16:
+            command.append('--fp16')
+        
+        os.makedirs(os.path.dirname(os.path.abspath(engine_path)), exist_ok=True)
+        
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"trtexec failed: {result.stderr.strip()[-2000:]}")
+        
+        logger.info(f"Built TensorRT {'fp16' if fp16 else 'fp32'} engine for {tuple(input_shape)}: {engine_path}")
+        return cls(engine_path, device)
+    
+    def __call__(self, input_tensor: torch.Tensor) -> torch.Tensor:
+        """Инференс: вход и выход остаются на GPU"""
+        input_tensor = input_tensor.to(self.device, dtype=torch.float32).contiguous()
+        self.context.set_input_shape(self.input_names[0], tuple(input_tensor.shape))
+        self.context.set_tensor_address(self.input_names[0], int(input_tensor.data_ptr()))
+        
+        outputs = {}
+        for name in self.output_names:
+            shape = tuple(self.context.get_tensor_shape(name))
+            outputs[name] = torch.empty(shape, dtype=torch.float32, device=self.device)
+            self.context.set_tensor_address(name, int(outputs[name].data_ptr()))
+        
+        stream = torch.cuda.current_stream(self.device)
+        if not self.context.execute_async_v3(stream.cuda_stream):
+            raise RuntimeError("TensorRT execution failed")
+        
+        return outputs[self.output_names[0]]
+
+
 class LiverSegmentationPipeline:
     """
     Полный пайплайн для сегментации печени
@@ -686,7 +1065,15 @@ class LiverSegmentationPipeline:
     
     def __init__(self, model_config: ModelConfig = None,
                  checkpoint_path: str = None,
-                 device: str = None):
+                 device: str = None,
+                 cudnn_benchmark: bool = True,
+                 channels_last: bool = True,
+                 compile_model: bool = False,
+                 compile_mode: str = 'reduce-overhead',
+                 mixed_precision: bool = False,
+                 fuse_batch_norm: bool = False,
+                 warmup_shape: Optional[Tuple[int, int, int]] = None,
+                 model: Optional[nn.Module] = None):
         """
         Инициализация пайплайна
         
@@ -694,18 +1081,79 @@ class LiverSegmentationPipeline:
             model_config: Конфигурация модели
             checkpoint_path: Путь к предобученным весам
             device: Устройство для вычислений
+            cudnn_benchmark: Автоподбор алгоритмов свертки cuDNN
+            channels_last: Формат памяти channels_last_3d (NDHWC) на GPU
+            compile_model: Компиляция модели через torch.compile. Каждая новая
+                форма входа вызывает перекомпиляцию, поэтому имеет смысл для
+                фиксированных форм (см. warmup_shape)
+            compile_mode: Режим torch.compile
+            mixed_precision: Инференс в bfloat16 (float16 на GPU без поддержки bf16);
+                меняет численные значения маски, поэтому включается явно
+            fuse_batch_norm: Слияние BatchNorm3d со сверткой (см. fuse_conv_bn).
+                После слияния модель пригодна только для инференса, и ее
+                state_dict несовместим с обычными чекпоинтами
+            warmup_shape: Форма объема [D, H, W] для прогревочного прохода
+            model: Готовая модель (например, TorchScript граф) вместо AdvancedUNet3D
         """
         self.device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
         logger.info(f"Using device: {self.device}")
         
+        # cuDNN выбирает самый быстрый алгоритм Conv3d для каждой формы входа
+        if cudnn_benchmark and str(self.device).startswith('cuda'):
+            torch.backends.cudnn.benchmark = True
+            torch.backends.cudnn.deterministic = False
+        
         self.config = model_config or ModelConfig()
-        self.model = AdvancedUNet3D(self.config).to(self.device)
+        self.model = (model if model is not None else AdvancedUNet3D(self.config)).to(self.device)
         
         if checkpoint_path:
             self.load_checkpoint(checkpoint_path)
         
+        # NDHWC убирает преобразования раскладки вокруг каждого вызова cuDNN
+        if channels_last and str(self.device).startswith('cuda'):
+            self.memory_format = torch.channels_last_3d
+        else:
+            self.memory_format = torch.contiguous_format
+        
         self.model.eval()
         
+        # Бинарная сегментация: порог по логиту (> 0) совпадает с порогом по
+        # вероятности (> 0.5), поскольку sigmoid монотонна, и полнообъемная
+        # sigmoid нужна только при запросе вероятностей
+        self.logit_output = isinstance(self.model, AdvancedUNet3D) and self.config.out_channels == 1
+        if self.logit_output:
+            self.model.output_logits = True
+        
+        # Слитые свертки создаются заново, поэтому формат памяти задается после
+        if fuse_batch_norm:
+            fuse_conv_bn(self.model)
+        
+        self.model = self.model.to(memory_format=self.memory_format)
+        
+        # Смешанная точность: вдвое меньше трафика активаций, тензорные ядра
+        self.autocast_dtype = None
+        if mixed_precision and str(self.device).startswith('cuda'):
+            self.autocast_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+        
+        # Скомпилированная копия используется только для инференса;
+        # self.model остается исходным модулем (чекпоинты, экспорт)
+        self.compiled_model = None
+        if compile_model:
+            if hasattr(torch, 'compile'):
+                self.compiled_model = torch.compile(self.model, mode=compile_mode, fullgraph=True)
+            else:
+                logger.warning("torch.compile not available, using eager model")
+        
+        if warmup_shape is not None:
+            self.warmup(warmup_shape)
+        
+        # Pinned буфер для загрузки входа на GPU (см. _to_device)
+        self._staging: Optional[torch.Tensor] = None
+        self._staging_copied: Optional[torch.cuda.Event] = None
+        
+        # TensorRT движки по форме входа (см. build_trt_engine)
+        self.trt_engines: Dict[Tuple[int, ...], TensorRTEngine] = {}
+        
         # Метрики
         self.metrics_history = {
             'dice': [],
@@ -715,6 +1163,45 @@ class LiverSegmentationPipeline:
             'hausdorff': []
         }
     
+    @property
+    def inference_model(self) -> nn.Module:
+        """Модель для инференса: скомпилированная, если доступна"""
+        return self.compiled_model if self.compiled_model is not None else self.model
+    
+    def warmup(self, volume_shape: Tuple[int, int, int]):
+        """Прогревочный проход: компиляция и автоподбор cuDNN выполняются один раз заранее"""
+        dummy = torch.zeros((1, self.config.in_channels) + tuple(volume_shape), device=self.device)
+        dummy = dummy.contiguous(memory_format=self.memory_format)
+        
+        with torch.no_grad():
+            try:
+                self._run_model(dummy)
+            except Exception as e:
+                if self.compiled_model is None:
+                    raise
+                
+                # Ошибки компиляции проявляются при первом вызове
+                logger.warning(f"torch.compile failed ({e}), using eager model")
+                self.compiled_model = None
+                self._run_model(dummy)
+        
+        if str(self.device).startswith('cuda'):
+            torch.cuda.synchronize()
+        
+        logger.info(f"Warmup completed for input shape {tuple(volume_shape)}")
+    
+    def _run_model(self, input_tensor: torch.Tensor) -> torch.Tensor:
+        """Прямой проход (в смешанной точности, если включена); выход в float32"""
+        with torch.autocast(device_type=torch.device(self.device).type,
+                            dtype=self.autocast_dtype,
+                            enabled=self.autocast_dtype is not None):
+            output = self.inference_model(input_tensor)
+        
+        if isinstance(output, (tuple, list)):  # Deep supervision
+            output = output[0]
+        
+        return output.float()
+    
     def load_checkpoint(self, checkpoint_path: str):
         """Загрузка контрольной точки"""
         try:
@@ -756,6 +1243,70 @@ class LiverSegmentationPipeline:
         torch.save(checkpoint, checkpoint_path)
         logger.info(f"Saved checkpoint to {checkpoint_path}")
     
+    def to_torchscript(self, path: str,
+                       example_shape: Tuple[int, int, int]) -> torch.jit.ScriptModule:
+        """
+        Экспорт замороженного TorchScript графа для развертывания
+        
+        Модель трассируется (torch.jit.script не поддерживает сравнения с Enum
+        в forward), затем torch.jit.freeze встраивает параметры как константы
+        и сворачивает Conv+BN и арифметику размеров. Граф специализирован
+        под example_shape. optimize_for_inference выполняется при загрузке
+        (from_torchscript): его результат зависит от устройства и не сериализуется.
+        
+        Первый вызов загруженного графа включает JIT-оптимизацию и заметно
+        медленнее последующих, поэтому после загрузки нужен прогревочный проход
+        (warmup_shape в from_torchscript).
+        
+        Args:
+            path: Путь к файлу .pt
+            example_shape: Форма объема [D, H, W]
+        
+        Returns:
+            Замороженный граф
+        """
+        example = torch.zeros((1, self.config.in_channels) + tuple(example_shape), device=self.device)
+        example = example.contiguous(memory_format=self.memory_format)
+        
+        self.model.eval()
+        
+        # Граф возвращает вероятности: загруженная модель не знает о логитах
+        output_logits = getattr(self.model, 'output_logits', False)
+        if output_logits:
+            self.model.output_logits = False
+        
+        try:
+            with torch.no_grad():
+                traced = torch.jit.trace(self.model, example, strict=False)
+                frozen = torch.jit.freeze(traced)
+        finally:
+            if output_logits:
+                self.model.output_logits = True
+        
+        torch.jit.save(frozen, path)
+        logger.info(f"Saved TorchScript model to {path}")
+        
+        return frozen
+    
+    @classmethod
+    def from_torchscript(cls, path: str, device: str = None,
+                         **kwargs) -> 'LiverSegmentationPipeline':
+        """
+        Пайплайн на основе TorchScript графа (см. to_torchscript)
+        
+        Args:
+            path: Путь к файлу .pt
+            device: Устройство для вычислений
+            **kwargs: Параметры LiverSegmentationPipeline (например, warmup_shape)
+        
+        Returns:
+            Пайплайн сегментации
+        """
+        device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+        model = torch.jit.optimize_for_inference(torch.jit.load(path, map_location=device))
+        
+        return cls(device=device, model=model, **kwargs)
+    
     def predict(self, volume: np.ndarray,
                window_center: float = 40.0,
                window_width: float = 400.0,
@@ -772,29 +1323,298 @@ class LiverSegmentationPipeline:
         Returns:
             Сегментационная маска
         """
+        # Готовый TensorRT движок для этой формы (см. build_trt_engine, from_trt)
+        if tuple(volume.shape) in self.trt_engines:
+            return self.predict_trt(volume, window_center, window_width, return_probabilities)
+        
         # Предобработка
         preprocessed = self._preprocess_volume(volume, window_center, window_width)
         
         # Инференс
         with torch.no_grad():
-            input_tensor = torch.from_numpy(preprocessed).float()
-            input_tensor = input_tensor.unsqueeze(0).unsqueeze(0).to(self.device)
+            input_tensor = self._to_device(torch.from_numpy(preprocessed).view(1, 1, *preprocessed.shape))
             
-            output = self.model(input_tensor)
+            output = self._run_model(input_tensor).squeeze()
+            result = self._finalize_output(output, return_probabilities).cpu().numpy()
+        
+        return result
+    
+    def build_trt_engine(self, input_shape: Tuple[int, int, int],
+                         precision: str = 'fp16',
+                         calibration_volumes: Optional[List[np.ndarray]] = None,
+                         cache_dir: str = 'models/trt_cache') -> TensorRTEngine:
+        """
+        Сборка (или загрузка из кэша) TensorRT движка для формы объема
+        
+        Args:
+            input_shape: Форма объема [D, H, W]
+            precision: 'fp32', 'fp16' или 'int8' (без калибровочных данных
+                и кэша калибровки INT8 заменяется на FP16)
+            calibration_volumes: Нормализованные объемы для INT8 калибровки
+            cache_dir: Каталог кэша движков и калибровки
+        
+        Returns:
+            TensorRT движок
+        """
+        full_shape = (1, self.config.in_channels) + tuple(input_shape)
+        calibration_cache = os.path.join(cache_dir, 'int8_calibration.cache')
+        
+        if precision == 'int8' and not calibration_volumes and not os.path.exists(calibration_cache):
+            logger.warning("No INT8 calibration volumes or cache found, building an FP16 engine")
+            precision = 'fp16'
+        
+        output_kind = 'logits' if self.logit_output else 'probs'
+        engine_path = TensorRTEngine.cache_path(cache_dir, full_shape, precision, output_kind)
+        
+        if os.path.exists(engine_path):
+            engine = TensorRTEngine(engine_path, self.device)
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+            onnx_path = export_onnx(self.model, os.path.join(cache_dir, f'unet3d_{output_kind}.onnx'),
+                                    full_shape, output_name=output_kind)
+            engine = TensorRTEngine.build(
+                onnx_path, engine_path, full_shape,
+                precision=precision,
+                calibration_volumes=calibration_volumes,
+                calibration_cache=calibration_cache,
+                device=self.device
+            )
+        
+        self.trt_engines[tuple(input_shape)] = engine
+        return engine
+    
+    def to_trt(self, path: str, input_shape: Tuple[int, int, int],
+               fp16: bool = True) -> TensorRTEngine:
+        """
+        Экспорт в ONNX и сборка TensorRT движка через trtexec
+        
+        Граф и движок фиксированы под input_shape; ONNX файл сохраняется
+        рядом с движком. Движок регистрируется в пайплайне, и predict()
+        для этой формы выполняется через TensorRT.
+        
+        Args:
+            path: Путь к файлу движка
+            input_shape: Форма объема [D, H, W]
+            fp16: FP16 ядра
+        
+        Returns:
+            TensorRT движок
+        """
+        full_shape = (1, self.config.in_channels) + tuple(input_shape)
+        onnx_path = os.path.splitext(path)[0] + '.onnx'
+        
+        export_onnx(self.model, onnx_path, full_shape, dynamic=False,
+                    output_name='logits' if self.logit_output else 'probs')
+        engine = TensorRTEngine.build_with_trtexec(onnx_path, path, full_shape,
+                                                   fp16=fp16, device=self.device)
+        
+        self.trt_engines[tuple(input_shape)] = engine
+        return engine
+    
+    @classmethod
+    def from_trt(cls, path: str, model_config: ModelConfig = None,
+                 device: str = None, **kwargs) -> 'LiverSegmentationPipeline':
+        """
+        Пайплайн с TensorRT движком (см. to_trt)
+        
+        model_config должен совпадать с конфигурацией экспортированной модели
+        (от нее зависит, возвращает ли движок логиты). Движок должен иметь
+        фиксированную форму входа, иначе ValueError. Без TensorRT остается
+        PyTorch модель (например, с checkpoint_path из kwargs).
+        
+        Args:
+            path: Путь к файлу движка
+            model_config: Конфигурация модели
+            device: Устройство для вычислений
+            **kwargs: Параметры LiverSegmentationPipeline
+        
+        Returns:
+            Пайплайн сегментации
+        """
+        pipeline = cls(model_config, device=device, **kwargs)
+        
+        try:
+            engine = TensorRTEngine(path, pipeline.device)
+        except ImportError:
+            logger.warning("TensorRT not available, using PyTorch model")
+            return pipeline
+        
+        # Ключ реестра - форма объема, поэтому движок должен быть с фиксированной формой
+        if any(dim < 0 for dim in engine.input_shape):
+            raise ValueError(f"TensorRT engine {path} has dynamic input shape {engine.input_shape}; "
+                             f"build a fixed-shape engine with to_trt()")
+        
+        pipeline.trt_engines[engine.input_shape[2:]] = engine
+        return pipeline
+    
+    def predict_trt(self, volume: np.ndarray,
+                   window_center: float = 40.0,
+                   window_width: float = 400.0,
+                   return_probabilities: bool = False,
+                   **engine_kwargs) -> np.ndarray:
+        """
+        Предсказание через TensorRT движок
+        
+        Движок для формы объема собирается при первом вызове (см.
+        build_trt_engine). Без TensorRT или GPU используется PyTorch.
+        """
+        engine = self.trt_engines.get(tuple(volume.shape))
+        
+        if engine is None:
+            if not str(self.device).startswith('cuda'):
+                logger.warning("TensorRT requires a CUDA device, falling back to PyTorch")
+                return self.predict(volume, window_center, window_width, return_probabilities)
             
-            if isinstance(output, tuple):  # Deep supervision
-                output = output[0]
+            try:
+                engine = self.build_trt_engine(volume.shape, **engine_kwargs)
+            except ImportError:
+                logger.warning("TensorRT not available, falling back to PyTorch")
+                return self.predict(volume, window_center, window_width, return_probabilities)
+        
+        preprocessed = self._preprocess_volume(volume, window_center, window_width)
+        
+        with torch.no_grad():
+            input_tensor = torch.from_numpy(preprocessed).view(1, 1, *preprocessed.shape).to(self.device)
+            output = engine(input_tensor).squeeze()
             
-            if return_probabilities:
-                result = output.squeeze().cpu().numpy()
+            return self._finalize_output(output, return_probabilities).cpu().numpy()
+    
+    def predict_batch(self, volumes: List[np.ndarray],
+                     batch_size: int = 4,
+                     window_center: float = 40.0,
+                     window_width: float = 400.0,
+                     return_probabilities: bool = False) -> List[np.ndarray]:
+        """
+        Пакетное предсказание
+        
+        Объемы группируются по форме, и каждая группа обрабатывается
+        батчами [B, 1, D, H, W] по batch_size объемов за один проход.
+        
+        Args:
+            volumes: Список 3D томограмм [D, H, W]
+            batch_size: Максимальный размер батча
+            window_center: Центр HU окна
+            window_width: Ширина HU окна
+            return_probabilities: Вернуть вероятности или бинарные маски
+        
+        Returns:
+            Список масок в порядке входных объемов
+        """
+        results: List[Optional[np.ndarray]] = [None] * len(volumes)
+        
+        # Группировка индексов по форме объема
+        groups: Dict[Tuple[int, ...], List[int]] = {}
+        for index, volume in enumerate(volumes):
+            groups.setdefault(tuple(volume.shape), []).append(index)
+        
+        chunks = [indices[start:start + batch_size]
+                  for indices in groups.values()
+                  for start in range(0, len(indices), batch_size)]
+        
+        def prepare(chunk: List[int]) -> np.ndarray:
+            return np.stack([
+                self._preprocess_volume(volumes[i], window_center, window_width)
+                for i in chunk
+            ])[:, np.newaxis]
+        
+        with torch.no_grad():
+            if str(self.device).startswith('cuda'):
+                outputs = self._predict_batch_streamed(chunks, prepare, return_probabilities)
             else:
-                result = (output.squeeze().cpu().numpy() > 0.5).astype('uint8')
+                outputs = map(lambda chunk: self._run_chunk(prepare(chunk), return_probabilities), chunks)
+            
+            for chunk, output in zip(chunks, outputs):
+                for i, result in zip(chunk, output):
+                    results[i] = result
         
-        return result
+        return results
+    
+    def _predict_batch_streamed(self, chunks: List[List[int]], prepare,
+                                return_probabilities: bool):
+        """
+        Конвейер на двух CUDA потоках
+        
+        Пока модель на вычислительном потоке обрабатывает батч i, поток копирования
+        загружает батч i+1, а хост забирает результат батча i-1.
+        """
+        copy_stream = torch.cuda.Stream()
+        compute_stream = torch.cuda.Stream()
+        
+        def upload(chunk: List[int]) -> Tuple[torch.Tensor, torch.cuda.Event]:
+            host = torch.from_numpy(prepare(chunk)).pin_memory()
+            with torch.cuda.stream(copy_stream):
+                tensor = host.to(self.device, non_blocking=True)
+                tensor = tensor.contiguous(memory_format=self.memory_format)
+                ready = torch.cuda.Event()
+                ready.record(copy_stream)
+            return tensor, ready
+        
+        pending = upload(chunks[0]) if chunks else None
+        previous = None
+        
+        for index in range(len(chunks)):
+            input_tensor, ready = pending
+            
+            with torch.cuda.stream(compute_stream):
+                compute_stream.wait_event(ready)
+                # Тензор выделен на потоке копирования
+                input_tensor.record_stream(compute_stream)
+                
+                output = self._finalize_output(self._run_model(input_tensor)[:, 0], return_probabilities)
+                
+                host_output = torch.empty(output.shape, dtype=output.dtype, pin_memory=True)
+                host_output.copy_(output, non_blocking=True)
+                done = torch.cuda.Event()
+                done.record(compute_stream)
+            
+            # Подготовка следующего батча на хосте перекрывается с вычислениями
+            if index + 1 < len(chunks):
+                pending = upload(chunks[index + 1])
+            
+            if previous is not None:
+                previous[1].synchronize()
+                yield previous[0].numpy()
+            previous = (host_output, done)
+        
+        if previous is not None:
+            previous[1].synchronize()
+            yield previous[0].numpy()
+    
+    def _run_chunk(self, batch: np.ndarray, return_probabilities: bool) -> np.ndarray:
+        """Синхронный прогон батча [B, 1, D, H, W]"""
+        output = self._run_model(self._to_device(torch.from_numpy(batch)))[:, 0]
+        return self._finalize_output(output, return_probabilities).cpu().numpy()
+    
+    def _finalize_output(self, output: torch.Tensor, return_probabilities: bool) -> torch.Tensor:
+        """Вероятности или маска на устройстве: на хост копируется uint8 вместо float32"""
+        if return_probabilities:
+            return torch.sigmoid(output) if self.logit_output else output
+        
+        threshold = 0.0 if self.logit_output else 0.5
+        return (output > threshold).to(torch.uint8)
     
-    def predict_batch(self, volumes: List[np.ndarray], **kwargs) -> List[np.ndarray]:
-        """Пакетное предсказание"""
-        return [self.predict(vol, **kwargs) for vol in volumes]
+    def _to_device(self, tensor: torch.Tensor) -> torch.Tensor:
+        """
+        Копирование на устройство: на GPU через pinned память без блокировки хоста
+        
+        Pinned буфер переиспользуется между вызовами с одинаковой формой.
+        """
+        if str(self.device).startswith('cuda'):
+            if self._staging is None or self._staging.shape != tensor.shape \
+                    or self._staging.dtype != tensor.dtype:
+                self._staging = torch.empty(tensor.shape, dtype=tensor.dtype, pin_memory=True)
+                self._staging_copied = None
+            elif self._staging_copied is not None:
+                # Предыдущее копирование из буфера должно завершиться до перезаписи
+                self._staging_copied.synchronize()
+            
+            self._staging.copy_(tensor)
+            tensor = self._staging.to(self.device, non_blocking=True)
+            
+            self._staging_copied = torch.cuda.Event()
+            self._staging_copied.record()
+        
+        return tensor.contiguous(memory_format=self.memory_format)
     
     def _preprocess_volume(self, volume: np.ndarray,
                           window_center: float,
@@ -827,23 +1647,27 @@ class LiverSegmentationPipeline:
         eps = 1e-7
         
         # Преобразование в бинарные маски
-        pred_binary = (prediction > 0.5).astype(np.uint8)
-        gt_binary = (ground_truth > 0.5).astype(np.uint8)
+        pred_binary = prediction > 0.5
+        gt_binary = ground_truth > 0.5
+        
+        # Количество вокселей (count_nonzero без временных массивов)
+        pred_voxels = np.count_nonzero(pred_binary)
+        gt_voxels = np.count_nonzero(gt_binary)
         
         # Пересечение и объединение
-        intersection = np.logical_and(pred_binary, gt_binary).sum()
-        union = np.logical_or(pred_binary, gt_binary).sum()
+        intersection = np.count_nonzero(pred_binary & gt_binary)
+        union = pred_voxels + gt_voxels - intersection
         
         # Dice coefficient
-        dice = (2. * intersection + eps) / (pred_binary.sum() + gt_binary.sum() + eps)
+        dice = (2. * intersection + eps) / (pred_voxels + gt_voxels + eps)
         
         # IoU (Jaccard index)
         iou = (intersection + eps) / (union + eps)
         
         # Precision and recall
         true_positive = intersection
-        false_positive = pred_binary.sum() - intersection
-        false_negative = gt_binary.sum() - intersection
+        false_positive = pred_voxels - intersection
+        false_negative = gt_voxels - intersection
         
         precision = (true_positive + eps) / (true_positive + false_positive + eps)
         recall = (true_positive + eps) / (true_positive + false_negative + eps)
@@ -857,7 +1681,7 @@ class LiverSegmentationPipeline:
             'precision': float(precision),
             'recall': float(recall),
             'hausdorff': float(hausdorff),
-            'volume_error': float(abs(pred_binary.sum() - gt_binary.sum()) / gt_binary.sum())
+            'volume_error': float(abs(pred_voxels - gt_voxels) / gt_voxels)
         }
         
         # Сохранение в историю
@@ -962,6 +1786,17 @@ def create_pretrained_model(model_name: str = 'liver_unet_v1',
             attention_type=AttentionType.SQUEEZE_EXCITATION,
             use_deep_supervision=True,
             dropout_rate=0.3
+        ),
+        # Облегченный вариант для инференса (обучается отдельно)
+        'liver_unet_separable': ModelConfig(
+            in_channels=1,
+            out_channels=1,
+            init_features=32,
+            depth=4,
+            conv_type=ConvType.SEPARABLE,
+            attention_type=AttentionType.NONE,
+            use_deep_supervision=False,
+            dropout_rate=0.1
         )
     }
     
@@ -21,6 +21,12 @@ from enum import Enum
 import json
 import traceback
 import time
+from functools import lru_cache
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
 
 # Configure logging
 logging.basicConfig(
@@ -29,6 +35,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Volume size (voxels) above which element-wise passes run as Numba kernels
+_NUMBA_MIN_SIZE = 1_000_000
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _normalize_kernel(volume, min_value, inv_width, out):
+        """Fused window subtract/scale/clip over flat buffers"""
+        for i in prange(volume.size):
+            value = (volume[i] - min_value) * inv_width
+            out[i] = min(max(value, 0.0), 1.0)
+    
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _noise_kernel(volume, noise, std, out):
+        """Fused scaled-noise add and clip to [0, 1] over flat buffers"""
+        for i in prange(volume.size):
+            value = volume[i] + std * noise[i]
+            out[i] = min(max(value, 0.0), 1.0)
+else:
+    _normalize_kernel = None
+    _noise_kernel = None
+
 
 class HUWindowPreset(Enum):
     """Standard HU window presets for CT imaging"""
@@ -49,6 +76,15 @@ class ResampleMethod(Enum):
     LANCZOS = "lanczos"
 
 
+# Spline order used by scipy/cupyx zoom for each resampling method
+_RESAMPLE_ORDERS = {
+    ResampleMethod.NEAREST: 0,
+    ResampleMethod.LINEAR: 1,
+    ResampleMethod.CUBIC: 3,
+    ResampleMethod.LANCZOS: 5,
+}
+
+
 class AugmentationType(Enum):
     """Types of data augmentation"""
     FLIP = "flip"
@@ -108,6 +144,7 @@ class PreprocessingConfig:
     # Augmentation
     augmentations: List[AugmentationType] = None
     augmentation_probability: float = 0.5
+    random_seed: Optional[int] = None  # Seed for the augmentation RNG
     
     # Quality control
     clip_hu_range: Tuple[float, float] = (-200, 400)  # Liver-specific range
@@ -138,9 +175,22 @@ class DICOMValidator:
     @staticmethod
     def validate_dicom_file(file_path: Path) -> bool:
         """Validate a single DICOM file"""
+        return DICOMValidator.read_valid_header(file_path) is not None
+    
+    @staticmethod
+    def read_valid_header(file_path: Path):
+        """
+        Read a DICOM header and validate it
+        
+        Large values (PixelData) are deferred rather than skipped, so their
+        presence can be checked without reading the pixels.
+        
+        Returns:
+            The dataset, or None if the file is not a valid DICOM image
+        """
         try:
             import pydicom
-            ds = pydicom.dcmread(file_path, stop_before_pixels=True)
+            ds = pydicom.dcmread(file_path, defer_size='1 KB')
             
             # Check essential tags
             required_tags = [
@@ -151,18 +201,18 @@ class DICOMValidator:
             for tag in required_tags:
                 if not hasattr(ds, tag):
                     logger.warning(f"DICOM missing required tag: {tag}")
-                    return False
+                    return None
             
-            # Check pixel data
-            if not hasattr(ds, 'PixelData'):
+            # Check pixel data (membership test, so the deferred value stays on disk)
+            if 'PixelData' not in ds:
                 logger.warning("DICOM missing pixel data")
-                return False
+                return None
             
-            return True
+            return ds
             
         except Exception as e:
             logger.error(f"DICOM validation failed: {e}")
-            return False
+            return None
     
     @staticmethod
     def validate_series(dicom_files: List[Path]) -> Dict:
@@ -281,6 +331,11 @@ class AdvancedDicomPreprocessor:
     
     def _setup_augmentation(self):
         """Setup augmentation methods"""
+        # Per-instance Generator: faster than the legacy global RNG and
+        # free of shared state across data-loader workers
+        self.rng = np.random.default_rng(self.config.random_seed)
+        self._noise_buffer = None
+        
         self.augmentation_methods = {
             AugmentationType.FLIP: self._apply_flip,
             AugmentationType.ROTATE: self._apply_rotation,
@@ -305,7 +360,7 @@ class AdvancedDicomPreprocessor:
             tuple: (volume, metadata)
         """
         path = Path(path)
-        start_time = time.time()
+        start_time = time.perf_counter_ns()
         
         try:
             if path.is_file():
@@ -317,7 +372,7 @@ class AdvancedDicomPreprocessor:
             else:
                 raise FileNotFoundError(f"DICOM path not found: {path}")
             
-            load_time = time.time() - start_time
+            load_time = (time.perf_counter_ns() - start_time) / 1e9
             logger.info(f"DICOM loaded: shape={volume.shape}, dtype={volume.dtype}, "
                        f"time={load_time:.2f}s, spacing={metadata.spacing}")
             
@@ -349,11 +404,9 @@ class AdvancedDicomPreprocessor:
                     )
             
             # Convert to HU
-            if hasattr(ds, 'RescaleSlope') and hasattr(ds, 'RescaleIntercept'):
-                volume = pixel_array.astype(np.float32) * ds.RescaleSlope + ds.RescaleIntercept
-            else:
-                volume = pixel_array.astype(np.float32)
+            if not (hasattr(ds, 'RescaleSlope') and hasattr(ds, 'RescaleIntercept')):
                 logger.warning(f"No rescale parameters found in {file_path.name}")
+            volume = _to_hounsfield(pixel_array, ds)
             
             # Extract metadata
             metadata = self._extract_metadata(ds, volume.shape)
@@ -365,10 +418,83 @@ class AdvancedDicomPreprocessor:
             return self._create_mock_data()
     
     def _load_dicom_series(self, directory: Path, sort_by_position: bool) -> Tuple[np.ndarray, DICOMMetadata]:
-        """Load DICOM series from directory"""
+        """Load DICOM series from directory (SimpleITK/GDCM if available, else pydicom)"""
+        try:
+            import SimpleITK as sitk
+        except ImportError:
+            sitk = None
+        
+        if sitk is not None:
+            try:
+                return self._load_dicom_series_sitk(sitk, directory)
+            except Exception as e:
+                logger.warning(f"SimpleITK series read failed ({e}), falling back to pydicom")
+        
+        return self._load_dicom_series_pydicom(directory, sort_by_position)
+    
+    def _load_dicom_series_sitk(self, sitk, directory: Path) -> Tuple[np.ndarray, DICOMMetadata]:
+        """
+        Read the whole series in one GDCM pass
+        
+        GDCM sorts slices by patient position and applies RescaleSlope/Intercept,
+        so the returned volume is already in HU.
+        """
+        reader = sitk.ImageSeriesReader()
+        files = reader.GetGDCMSeriesFileNames(str(directory))
+        if not files:
+            raise ValueError(f"No DICOM series found in {directory}")
+        
+        logger.info(f"Found DICOM series of {len(files)} files")
+        
+        reader.SetFileNames(files)
+        reader.MetaDataDictionaryArrayUpdateOn()
+        image = reader.Execute()
+        
+        volume = sitk.GetArrayFromImage(image).astype(np.float32, copy=False)
+        metadata = self._extract_sitk_metadata(reader, image, volume.shape)
+        
+        return volume, metadata
+    
+    def _extract_sitk_metadata(self, reader, image, shape: Tuple) -> DICOMMetadata:
+        """Build metadata from the first slice's tags and the SimpleITK image geometry"""
+        def tag(key: str, default):
+            if not reader.HasMetaDataKey(0, key):
+                return default
+            # Multi-valued tags (e.g. WindowCenter) are backslash separated
+            return reader.GetMetaData(0, key).split('\\')[0].strip() or default
+        
+        spacing_x, spacing_y, spacing_z = image.GetSpacing()
+        direction = image.GetDirection()
+        
+        return DICOMMetadata(
+            patient_id=tag('0010|0020', 'ANONYMIZED'),
+            study_instance_uid=tag('0020|000d', ''),
+            series_instance_uid=tag('0020|000e', ''),
+            study_date=tag('0008|0020', ''),
+            modality=tag('0008|0060', 'CT'),
+            rows=shape[2],
+            columns=shape[1],
+            slices=shape[0],
+            spacing=(float(spacing_z), float(spacing_y), float(spacing_x)),
+            origin=tuple(float(x) for x in image.GetOrigin()),
+            orientation=tuple(float(direction[i]) for i in (0, 3, 6, 1, 4, 7)),
+            window_center=float(tag('0028|1050', 40.0)),
+            window_width=float(tag('0028|1051', 400.0)),
+            rescale_slope=float(tag('0028|1053', 1.0)),
+            rescale_intercept=float(tag('0028|1052', 0.0)),
+            bits_allocated=int(tag('0028|0100', 16)),
+            bits_stored=int(tag('0028|0101', 12)),
+            pixel_representation=int(tag('0028|0103', 0)),
+            manufacturer=str(tag('0008|0070', 'UNKNOWN')),
+            manufacturer_model=str(tag('0008|1090', 'UNKNOWN')),
+            institution=str(tag('0008|0080', 'UNKNOWN'))
+        )
+    
+    def _load_dicom_series_pydicom(self, directory: Path, sort_by_position: bool) -> Tuple[np.ndarray, DICOMMetadata]:
+        """Load DICOM series from directory with pydicom"""
         try:
             import pydicom
-            from concurrent.futures import ThreadPoolExecutor, as_completed
+            from concurrent.futures import ThreadPoolExecutor
             
             # Find DICOM files
             dicom_files = list(directory.glob("*.dcm")) + list(directory.glob("*.DCM"))
@@ -377,84 +503,51 @@ class AdvancedDicomPreprocessor:
             
             logger.info(f"Found {len(dicom_files)} potential DICOM files")
             
-            # Validate files
-            valid_files = []
+            # Validate files and read their headers in one parallel pass
             with ThreadPoolExecutor(max_workers=self.config.num_workers) as executor:
-                future_to_file = {
-                    executor.submit(self.validator.validate_dicom_file, f): f 
-                    for f in dicom_files[:100]  # Limit for performance
-                }
-                
-                for future in as_completed(future_to_file):
-                    file = future_to_file[future]
-                    if future.result():
-                        valid_files.append(file)
+                headers = list(executor.map(self.validator.read_valid_header, dicom_files))
             
-            if not valid_files:
+            series = [(ds, f) for ds, f in zip(headers, dicom_files) if ds is not None]
+            if not series:
                 raise ValueError(f"No valid DICOM files found in {directory}")
             
-            logger.info(f"Validated {len(valid_files)} DICOM files")
-            
-            # Load metadata first
-            slice_metadata = []
-            positions = []
-            
-            for file_path in valid_files[:50]:  # Sample for speed
-                try:
-                    ds = pydicom.dcmread(file_path, stop_before_pixels=True)
-                    position = getattr(ds, 'ImagePositionPatient', [0, 0, len(slice_metadata)])
-                    positions.append((position[2], file_path))
-                    slice_metadata.append(ds)
-                except:
-                    continue
+            logger.info(f"Validated {len(series)} DICOM files")
             
             # Sort by position if requested
-            if sort_by_position and positions:
-                valid_files = [f for _, f in sorted(positions)]
+            if sort_by_position:
+                series.sort(key=lambda item: float(
+                    getattr(item[0], 'ImagePositionPatient', [0, 0, 0])[2]))
             
-            # Load pixel data in batches
-            volume_slices = []
-            batch_size = min(self.config.batch_size, len(valid_files))
+            ref_ds = series[0][0]
+            volume = np.empty((len(series), int(ref_ds.Rows), int(ref_ds.Columns)), dtype=np.float32)
             
-            for i in range(0, len(valid_files), batch_size):
-                batch_files = valid_files[i:i + batch_size]
-                batch_slices = []
-                
-                for file_path in batch_files:
-                    try:
-                        ds = pydicom.dcmread(file_path, force=True)
-                        pixel_array = ds.pixel_array
-                        
-                        # Convert to HU
-                        if hasattr(ds, 'RescaleSlope') and hasattr(ds, 'RescaleIntercept'):
-                            hu_slice = pixel_array.astype(np.float32) * ds.RescaleSlope + ds.RescaleIntercept
-                        else:
-                            hu_slice = pixel_array.astype(np.float32)
-                        
-                        batch_slices.append(hu_slice)
-                        
-                    except Exception as e:
-                        logger.warning(f"Failed to load {file_path.name}: {e}")
-                        # Add empty slice as placeholder
-                        if slice_metadata:
-                            ref_ds = slice_metadata[0]
-                            batch_slices.append(
-                                np.zeros((ref_ds.Rows, ref_ds.Columns), dtype=np.float32)
-                            )
-                
-                if batch_slices:
-                    volume_slices.extend(batch_slices)
-                
-                logger.info(f"Loaded batch {i//batch_size + 1}/{(len(valid_files)-1)//batch_size + 1}")
+            def decode_slice(index: int) -> bool:
+                """Decode one slice straight into the volume (pixel decoders release the GIL)"""
+                file_path = series[index][1]
+                try:
+                    ds = pydicom.dcmread(file_path, force=True)
+                    pixel_array = ds.pixel_array
+                    
+                    # Convert to HU
+                    _to_hounsfield(pixel_array, ds, out=volume[index])
+                    
+                    return True
+                    
+                except Exception as e:
+                    logger.warning(f"Failed to load {file_path.name}: {e}")
+                    # Empty placeholder
+                    volume[index] = 0
+                    return False
+            
+            with ThreadPoolExecutor(max_workers=self.config.num_workers) as executor:
+                loaded = sum(executor.map(decode_slice, range(len(series))))
             
-            if not volume_slices:
+            if not loaded:
                 raise ValueError("No slices loaded")
             
-            # Stack slices into volume
-            volume = np.stack(volume_slices, axis=0)
+            logger.info(f"Loaded {loaded}/{len(series)} slices")
             
             # Use first slice metadata
-            ref_ds = slice_metadata[0] if slice_metadata else pydicom.Dataset()
             metadata = self._extract_metadata(ref_ds, volume.shape)
             
             return volume, metadata
@@ -550,10 +643,6 @@ class AdvancedDicomPreprocessor:
         """
         logger.info("Normalizing HU values...")
         
-        # Clip to valid HU range
-        min_hu, max_hu = self.config.clip_hu_range
-        volume = np.clip(volume, min_hu, max_hu)
-        
         # Get window settings
         if metadata:
             window_center = metadata.window_center
@@ -578,9 +667,13 @@ class AdvancedDicomPreprocessor:
         min_value = window_center - window_width / 2.0
         max_value = window_center + window_width / 2.0
         
+        # Clipping to the valid HU range only matters if the window extends past it
+        min_hu, max_hu = self.config.clip_hu_range
+        if min_value < min_hu or max_value > max_hu:
+            volume = np.clip(volume, min_hu, max_hu)
+        
         # Normalize
-        normalized = (volume - min_value) / (max_value - min_value)
-        normalized = np.clip(normalized, 0.0, 1.0)
+        normalized = normalize_hounsfield_units(volume, window_center, window_width)
         
         # Remove artifacts (extreme values)
         if self.config.remove_artifacts:
@@ -590,7 +683,7 @@ class AdvancedDicomPreprocessor:
         
         logger.info(f"Normalization complete: window=[{min_value:.1f}, {max_value:.1f}]")
         
-        return normalized.astype(np.float32)
+        return normalized.astype(np.float32, copy=False)
     
     def resample_volume(self, volume: np.ndarray,
                        current_spacing: Tuple[float, float, float],
@@ -612,33 +705,28 @@ class AdvancedDicomPreprocessor:
         logger.info(f"Resampling from {current_spacing} to {target_spacing}...")
         
         # Calculate zoom factors
-        zoom_factors = [
-            current_spacing[i] / target_spacing[i]
-            for i in range(3)
-        ]
+        zoom_factors = _zoom_factors(tuple(current_spacing), tuple(target_spacing))
         
         # Skip resampling if factors are close to 1
         if all(abs(f - 1.0) < 0.01 for f in zoom_factors):
             logger.info("Resampling skipped (spacing already close to target)")
             return volume
         
+        # Tensors (e.g. already on the GPU) are resampled on their own device
+        if not isinstance(volume, np.ndarray):
+            return self._resample_tensor(volume, zoom_factors)
+        
+        order = _RESAMPLE_ORDERS[self.config.resample_method]
+        
         try:
             if self._gpu_available:
                 # GPU resampling with CuPy
                 volume_gpu = self._cp.asarray(volume)
                 
-                if self.config.resample_method == ResampleMethod.NEAREST:
-                    order = 0
-                elif self.config.resample_method == ResampleMethod.LINEAR:
-                    order = 1
-                elif self.config.resample_method == ResampleMethod.CUBIC:
-                    order = 3
-                else:  # LANCZOS
-                    order = 5
-                
                 resampled_gpu = self._ndimage_gpu.zoom(
                     volume_gpu,
                     zoom=zoom_factors,
+                    output=self._cp.float32,
                     order=order,
                     mode='constant',
                     cval=0.0
@@ -647,19 +735,11 @@ class AdvancedDicomPreprocessor:
                 resampled = self._cp.asnumpy(resampled_gpu)
                 
             elif self._scipy_available:
-                # CPU resampling with SciPy
-                if self.config.resample_method == ResampleMethod.NEAREST:
-                    order = 0
-                elif self.config.resample_method == ResampleMethod.LINEAR:
-                    order = 1
-                elif self.config.resample_method == ResampleMethod.CUBIC:
-                    order = 3
-                else:  # LANCZOS
-                    order = 5
-                
+                # CPU resampling with SciPy, written straight to float32
                 resampled = self._ndimage.zoom(
                     volume,
                     zoom=zoom_factors,
+                    output=np.float32,
                     order=order,
                     mode='constant',
                     cval=0.0
@@ -687,6 +767,26 @@ class AdvancedDicomPreprocessor:
             logger.error(traceback.format_exc())
             return volume
     
+    def _resample_tensor(self, volume, zoom_factors: Tuple[float, float, float]):
+        """
+        Resample a [D, H, W] torch tensor with F.interpolate on its device
+        
+        Trilinear with align_corners=True matches the corner-aligned grid of
+        ndimage.zoom; methods above linear fall back to trilinear.
+        """
+        import torch.nn.functional as F
+        
+        size = tuple(int(round(s * f)) for s, f in zip(volume.shape, zoom_factors))
+        
+        if self.config.resample_method == ResampleMethod.NEAREST:
+            resampled = F.interpolate(volume[None, None].float(), size=size, mode='nearest')
+        else:
+            resampled = F.interpolate(volume[None, None].float(), size=size,
+                                      mode='trilinear', align_corners=True)
+        
+        logger.info(f"Resampling complete: {tuple(volume.shape)} -> {size}")
+        return resampled[0, 0]
+    
     def apply_augmentation(self, volume: np.ndarray, 
                           mask: Optional[np.ndarray] = None,
                           augmentation_types: Optional[List[AugmentationType]] = None) -> Tuple:
@@ -704,7 +804,7 @@ class AdvancedDicomPreprocessor:
         if augmentation_types is None:
             augmentation_types = self.config.augmentations
         
-        if np.random.random() > self.config.augmentation_probability:
+        if self.rng.random() > self.config.augmentation_probability:
             return (volume, mask) if mask is not None else volume
         
         logger.info(f"Applying augmentations: {[a.value for a in augmentation_types]}")
@@ -723,12 +823,76 @@ class AdvancedDicomPreprocessor:
         
         return (augmented_volume, augmented_mask) if mask is not None else augmented_volume
     
+    def apply_augmentation_torch(self, volume, mask=None,
+                                 augmentation_types: Optional[List[AugmentationType]] = None):
+        """
+        Apply augmentation to torch tensors on their own device
+        
+        GPU counterpart of apply_augmentation for volumes already moved to the
+        device: flips and rotations are tensor ops, noise and contrast run in
+        place on a copy, so the augmented volume never goes back through the host.
+        Only FLIP, ROTATE, NOISE and CONTRAST are supported; other types are skipped.
+        
+        Args:
+            volume: Float volume tensor [..., H, W] with values in [0, 1]
+            mask: Optional segmentation mask tensor (augmented similarly)
+            augmentation_types: Specific augmentations to apply
+        
+        Returns:
+            Augmented volume (and mask if provided)
+        """
+        import torch
+        
+        if augmentation_types is None:
+            augmentation_types = self.config.augmentations
+        
+        if self.rng.random() > self.config.augmentation_probability:
+            return (volume, mask) if mask is not None else volume
+        
+        # In-place ops below must not reach the caller's tensor
+        volume = volume.clone()
+        
+        for aug_type in augmentation_types:
+            if aug_type == AugmentationType.FLIP:
+                dims = [dim for dim in (-2, -1) if self.rng.random() > 0.5]
+                if dims:
+                    volume = torch.flip(volume, dims=dims)
+                    if mask is not None:
+                        mask = torch.flip(mask, dims=dims)
+            
+            elif aug_type == AugmentationType.ROTATE:
+                k = int(self.rng.integers(4))  # 0, 90, 180, 270 degrees
+                if k > 0:
+                    volume = torch.rot90(volume, k=k, dims=(-2, -1))
+                    if mask is not None:
+                        mask = torch.rot90(mask, k=k, dims=(-2, -1))
+            
+            elif aug_type == AugmentationType.NOISE:
+                noise_level = self.rng.uniform(0.0, 0.05)
+                if noise_level > 0:
+                    # Device-side noise, seeded from self.rng for reproducibility
+                    generator = torch.Generator(device=volume.device)
+                    generator.manual_seed(int(self.rng.integers(2 ** 63 - 1)))
+                    noise = torch.randn(volume.shape, generator=generator,
+                                        device=volume.device, dtype=volume.dtype)
+                    volume.add_(noise, alpha=noise_level).clamp_(0.0, 1.0)
+            
+            elif aug_type == AugmentationType.CONTRAST:
+                gamma = self.rng.uniform(0.8, 1.2)
+                if abs(gamma - 1.0) > 0.01:
+                    volume.pow_(gamma)
+            
+            else:
+                logger.debug(f"Augmentation {aug_type} not supported on tensors, skipped")
+        
+        return (volume, mask) if mask is not None else volume
+    
     def _apply_flip(self, volume: np.ndarray, mask: Optional[np.ndarray] = None) -> Tuple:
         """Apply random flipping"""
         axes = []
-        if np.random.random() > 0.5:
+        if self.rng.random() > 0.5:
             axes.append(1)  # Flip horizontal
-        if np.random.random() > 0.5:
+        if self.rng.random() > 0.5:
             axes.append(2)  # Flip vertical
         
         if axes:
@@ -740,7 +904,7 @@ class AdvancedDicomPreprocessor:
     
     def _apply_rotation(self, volume: np.ndarray, mask: Optional[np.ndarray] = None) -> Tuple:
         """Apply random rotation (in-plane)"""
-        k = np.random.choice([0, 1, 2, 3])  # 0, 90, 180, 270 degrees
+        k = self.rng.integers(4)  # 0, 90, 180, 270 degrees
         if k > 0:
             volume = np.rot90(volume, k=k, axes=(1, 2))
             if mask is not None:
@@ -752,8 +916,8 @@ class AdvancedDicomPreprocessor:
         """Apply random translation"""
         max_shift = int(min(volume.shape[1:]) * 0.1)  # Max 10% shift
         shifts = [
-            np.random.randint(-max_shift, max_shift + 1),
-            np.random.randint(-max_shift, max_shift + 1)
+            self.rng.integers(-max_shift, max_shift + 1),
+            self.rng.integers(-max_shift, max_shift + 1)
         ]
         
         if any(s != 0 for s in shifts):
@@ -766,7 +930,7 @@ class AdvancedDicomPreprocessor:
     
     def _apply_scale(self, volume: np.ndarray, mask: Optional[np.ndarray] = None) -> Tuple:
         """Apply random scaling"""
-        scale_factor = np.random.uniform(0.9, 1.1)
+        scale_factor = self.rng.uniform(0.9, 1.1)
         
         if abs(scale_factor - 1.0) > 0.01:
             from skimage.transform import rescale
@@ -789,11 +953,11 @@ class AdvancedDicomPreprocessor:
             sigma = shape[1] * 0.08
             
             dx = gaussian_filter(
-                (np.random.rand(*shape) * 2 - 1),
+                (self.rng.random(shape) * 2 - 1),
                 sigma, mode="constant"
             ) * alpha
             dy = gaussian_filter(
-                (np.random.rand(*shape) * 2 - 1),
+                (self.rng.random(shape) * 2 - 1),
                 sigma, mode="constant"
             ) * alpha
             
@@ -821,18 +985,34 @@ class AdvancedDicomPreprocessor:
         return volume, mask
     
     def _apply_noise(self, volume: np.ndarray, mask: Optional[np.ndarray] = None) -> Tuple:
-        """Add Gaussian noise"""
-        noise_level = np.random.uniform(0.0, 0.05)
+        """Add Gaussian noise (in place: apply_augmentation works on a copy)"""
+        noise_level = self.rng.uniform(0.0, 0.05)
         if noise_level > 0:
-            noise = np.random.normal(0, noise_level, volume.shape)
-            volume = volume + noise
-            volume = np.clip(volume, 0, 1)
+            if volume.dtype not in (np.float32, np.float64):
+                volume = volume.astype(np.float32)
+            
+            # Noise is drawn from self.rng (reproducible with random_seed) into
+            # a buffer reused across calls of the same shape
+            if self._noise_buffer is None or self._noise_buffer.shape != volume.shape \
+                    or self._noise_buffer.dtype != volume.dtype:
+                self._noise_buffer = np.empty(volume.shape, dtype=volume.dtype)
+            
+            noise = self.rng.standard_normal(dtype=volume.dtype, out=self._noise_buffer)
+            
+            if (_noise_kernel is not None and volume.size > _NUMBA_MIN_SIZE
+                    and volume.flags.c_contiguous):
+                flat = volume.reshape(-1)
+                _noise_kernel(flat, noise.reshape(-1), volume.dtype.type(noise_level), flat)
+            else:
+                noise *= noise_level
+                volume += noise
+                np.clip(volume, 0.0, 1.0, out=volume)
         
         return volume, mask
     
     def _apply_contrast_adjustment(self, volume: np.ndarray, mask: Optional[np.ndarray] = None) -> Tuple:
         """Adjust contrast"""
-        gamma = np.random.uniform(0.8, 1.2)
+        gamma = self.rng.uniform(0.8, 1.2)
         if abs(gamma - 1.0) > 0.01:
             volume = np.power(volume, gamma)
         
@@ -840,7 +1020,7 @@ class AdvancedDicomPreprocessor:
     
     def _apply_blur(self, volume: np.ndarray, mask: Optional[np.ndarray] = None) -> Tuple:
         """Apply Gaussian blur"""
-        sigma = np.random.uniform(0.0, 1.5)
+        sigma = self.rng.uniform(0.0, 1.5)
         if sigma > 0.1:
             from scipy.ndimage import gaussian_filter
             volume = gaussian_filter(volume, sigma=(0, sigma, sigma))
@@ -927,7 +1107,7 @@ class AdvancedDicomPreprocessor:
             'error': None
         }
         
-        start_time = time.time()
+        start_time = time.perf_counter_ns()
         
         try:
             # Step 1: Load DICOM
@@ -957,7 +1137,7 @@ class AdvancedDicomPreprocessor:
             # Step 5: Quality control
             volume = self._apply_quality_control(volume)
             
-            processing_time = time.time() - start_time
+            processing_time = (time.perf_counter_ns() - start_time) / 1e9
             
             results.update({
                 'success': True,
@@ -987,7 +1167,7 @@ class AdvancedDicomPreprocessor:
             return results
             
         except Exception as e:
-            processing_time = time.time() - start_time
+            processing_time = (time.perf_counter_ns() - start_time) / 1e9
             results.update({
                 'processing_time': processing_time,
                 'error': str(e),
@@ -1019,6 +1199,73 @@ class AdvancedDicomPreprocessor:
 
 
 # Utility functions
+@lru_cache(maxsize=64)
+def _zoom_factors(current_spacing: Tuple[float, ...],
+                  target_spacing: Tuple[float, ...]) -> Tuple[float, ...]:
+    """Per-axis zoom factors (series in a batch usually share their spacing)"""
+    return tuple(float(c) / float(t) for c, t in zip(current_spacing, target_spacing))
+
+
+def _to_hounsfield(pixel_array: np.ndarray, dicom_dataset,
+                   out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert stored pixel values to HU as float32
+    
+    Slope and intercept are applied as float32 scalars (Python floats would
+    promote integer pixel data to float64) and skipped when they are 1 and 0.
+    """
+    if out is None:
+        out = np.empty(pixel_array.shape, dtype=np.float32)
+    
+    slope = np.float32(getattr(dicom_dataset, 'RescaleSlope', 1.0))
+    intercept = np.float32(getattr(dicom_dataset, 'RescaleIntercept', 0.0))
+    
+    if slope != 1.0:
+        np.multiply(pixel_array, slope, out=out, dtype=np.float32, casting='unsafe')
+    else:
+        out[...] = pixel_array
+    
+    if intercept != 0.0:
+        out += intercept
+    
+    return out
+
+
+def normalize_hounsfield_units(volume: np.ndarray,
+                               window_center: float = 40.0,
+                               window_width: float = 400.0,
+                               out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Map an HU window to [0, 1] as float32
+    
+    Subtract, scale and clip all run in place on a single float32 buffer.
+    
+    Args:
+        volume: Input HU volume
+        window_center: Window center (HU)
+        window_width: Window width (HU)
+        out: Optional float32 output buffer (may be volume itself)
+    
+    Returns:
+        Normalized volume [0, 1]
+    """
+    if out is None:
+        out = np.empty(volume.shape, dtype=np.float32)
+    
+    min_value = window_center - window_width / 2.0
+    
+    if _normalize_kernel is not None and volume.size > _NUMBA_MIN_SIZE and out.flags.c_contiguous:
+        _normalize_kernel(volume.reshape(-1), np.float32(min_value),
+                          np.float32(1.0 / window_width), out.reshape(-1))
+        return out
+    
+    np.subtract(volume, min_value, out=out, dtype=np.float32, casting='unsafe')
+    np.multiply(out, 1.0 / window_width, out=out)
+    np.clip(out, 0.0, 1.0, out=out)
+    
+    return out
+
+
 def create_liver_segmentation_dataset(dicom_paths: List[Union[str, Path]],
                                      output_dir: Union[str, Path],
                                      config: PreprocessingConfig = None,